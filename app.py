@@ -3,83 +3,38 @@ Wordle Competitions Web Application
 Calculates and displays Skins competition results
 """
 
-from flask import Flask, render_template
-import csv
-from datetime import datetime
-from collections import defaultdict
+from flask import Flask, render_template, Response, stream_with_context, jsonify, request, url_for
+import json
+import hmac
 import config
+import score_store
+import score_cache
+import skins_engine
+import metrics
+import fragment_cache
+import ingest
+import player_stats
+from round_results import resolve_competitor_columns
 
 app = Flask(__name__)
 app.secret_key = 'wordle-competitions-secret-key-change-in-production'
+app.config['MAX_CONTENT_LENGTH'] = config.INGEST_MAX_BYTES
 
 # Import and register the rounds blueprint
 from round_routes import rounds_bp
 app.register_blueprint(rounds_bp)
+metrics.init_app(app)
 
 
 def parse_date(date_str):
-    """Convert date string like 'May-15' to a datetime object (assuming current year)"""
-    # Add year 2024 for parsing (you can adjust this logic as needed)
-    try:
-        return datetime.strptime(f"{date_str}-2024", "%b-%d-%Y")
-    except ValueError:
-        # Handle different formats if needed
-        return None
+    """Convert a score date (YYMMDD, or legacy 'May-15' assumed 2024) to a datetime object"""
+    return score_store.parse_score_date(date_str)
 
 
 def load_scores():
-    """Load scores from CSV file and organize by rounds"""
-    rounds = []
-    current_round = None
-    
-    with open(config.SPREADSHEET_PATH, 'r') as f:
-        reader = csv.reader(f)
-        rows = list(reader)
-        
-        # Skip first two rows (teams and player names)
-        # Row 1: Teams
-        # Row 2: Headers (Date, Hole, Player names...)
-        player_names = [name.strip() for name in rows[1][2:]]  # Skip Date and Hole columns
-        
-        for row in rows[2:]:  # Start from row 3 (index 2)
-            if not row or not row[0]:  # Skip empty rows
-                continue
-                
-            date_str = row[0].strip()
-            hole_num = int(row[1].strip())
-            scores = [int(score.strip()) if score.strip() else config.DEFAULT_SCORE 
-                     for score in row[2:]]
-            
-            # If hole is 1, start a new round
-            if hole_num == 1:
-                if current_round:  # Save previous round
-                    rounds.append(current_round)
-                current_round = {
-                    'holes': [],
-                    'start_date': None,
-                    'end_date': None
-                }
-            
-            # Add hole to current round
-            if current_round is not None:
-                hole_data = {
-                    'date': date_str,
-                    'date_obj': parse_date(date_str),
-                    'hole_num': hole_num,
-                    'scores': dict(zip(player_names, scores))
-                }
-                current_round['holes'].append(hole_data)
-                
-                # Update round dates
-                if current_round['start_date'] is None:
-                    current_round['start_date'] = date_str
-                current_round['end_date'] = date_str
-        
-        # Don't forget the last round
-        if current_round and current_round['holes']:
-            rounds.append(current_round)
-    
-    return rounds, player_names
+    """Load scores from the score store and organize by rounds"""
+    store = score_store.load_store(config.SPREADSHEET_PATH)
+    return score_store.get_rounds(store), store.players
 
 
 def calculate_skins(round_data, player_names):
@@ -89,20 +44,18 @@ def calculate_skins(round_data, player_names):
     """
     skins = {player: 0 for player in player_names}
     points_pool = 0  # Accumulated points when no one wins
+    store = round_data['store']
     
-    for hole in round_data['holes']:
-        scores = hole['scores']
+    for row in range(round_data['start'], round_data['stop']):
+        scores = store.row(row)
         points_pool += 1  # Each hole adds 1 point to the pool
         
         # Find the minimum score for this hole
-        min_score = min(scores.values())
-        
-        # Find all players with the minimum score
-        winners = [player for player, score in scores.items() if score == min_score]
+        min_score = min(scores)
         
         # If exactly one player has the lowest score, they win the skin
-        if len(winners) == 1:
-            winner = winners[0]
+        if scores.count(min_score) == 1:
+            winner = player_names[scores.index(min_score)]
             skins[winner] += points_pool
             points_pool = 0  # Reset the pool after a skin is won
     
@@ -118,23 +71,175 @@ def index():
 @app.route('/skins')
 def skins():
     """Skins competition page"""
-    rounds, player_names = load_scores()
+    # Parsed rounds and skins results are cached until the scores file changes
+    scores = score_cache.get_skins_results()
+    player_names = scores['players']
+    
+    players_key = tuple(player_names)
     
-    # Calculate skins for each round
     rounds_with_skins = []
-    for i, round_data in enumerate(rounds, 1):
-        skins_results = calculate_skins(round_data, player_names)
-        rounds_with_skins.append({
+    for i, (round_data, results) in enumerate(zip(scores['rounds'], scores['skins']), 1):
+        round_summary = {
             'round_num': i,
             'start_date': round_data['start_date'],
             'end_date': round_data['end_date'],
-            'skins': skins_results,
-            'total_holes': len(round_data['holes'])
-        })
+            'skins': results['skins'],
+            'total_holes': round_data['total_holes']
+        }
+        # Each round is rendered once and re-rendered only if its results change
+        key = (i, round_data['start_date'], round_data['end_date'], round_data['total_holes'],
+               players_key, tuple(results['skins'].values()))
+        round_summary['html'] = fragment_cache.render('_skins_round.html', key,
+                                                      round=round_summary,
+                                                      players=player_names)
+        rounds_with_skins.append(round_summary)
+    
+    with metrics.phase('render'):
+        return render_template('skins.html', 
+                             rounds=rounds_with_skins, 
+                             players=player_names)
+
+
+def ndjson_response(lines):
+    """Stream an iterable of JSON-serializable objects as newline-delimited JSON"""
+    def generate():
+        for line in lines:
+            yield json.dumps(line) + '\n'
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+@app.route('/api/skins')
+def api_skins():
+    """Stream skins results as NDJSON, one line per round"""
+    scores = score_cache.get_scores()
+    store = scores['store']
+    rounds = scores['rounds']
+    
+    def round_lines():
+        results = skins_engine.iter_round_skins(store, rounds)
+        for i, (round_data, result) in enumerate(zip(rounds, results), 1):
+            yield {
+                'type': 'round',
+                'round_num': i,
+                'start_date': round_data['start_date'],
+                'end_date': round_data['end_date'],
+                'total_holes': round_data['total_holes'],
+                'skins': result['skins'],
+                'pot_carried': result['pot_carried']
+            }
+    
+    return ndjson_response(round_lines())
+
+
+@app.route('/api/skins/<int:round_num>')
+def api_round_skins(round_num):
+    """Stream one round's skins as NDJSON, one line per hole followed by the totals"""
+    scores = score_cache.get_scores()
+    store = scores['store']
+    if not 1 <= round_num <= len(scores['rounds']):
+        return jsonify({'error': 'Round not found'}), 404
+    round_data = scores['rounds'][round_num - 1]
+    
+    def hole_lines():
+        state = skins_engine.new_skins_state(store.players)
+        for row in range(round_data['start'], round_data['stop']):
+            winner = skins_engine.append_hole(state, store.row(row))
+            yield {
+                'type': 'hole',
+                'round_num': round_num,
+                'hole': store.hole_num(row),
+                'date': store.date(row),
+                'scores': dict(zip(store.players, store.row(row))),
+                'winner': winner,
+                'points': state['hole_points'][-1],
+                'pot': state['pot']
+            }
+        yield {
+            'type': 'total',
+            'round_num': round_num,
+            'skins': state['skins'],
+            'pot_carried': state['pot']
+        }
+    
+    return ndjson_response(hole_lines())
+
+
+@app.route('/api/ingest', methods=['POST'])
+def api_ingest():
+    """
+    Queue new WhatsApp chat text for ingestion and return straight away
+    
+    The chat text (a full export or just its newest messages) is the request
+    body or an uploaded 'file' field. Responds 202 with the job; its status
+    is at the URL in the Location header. Ingestion rewrites the scores CSV,
+    so it is refused unless config.INGEST_TOKEN is set and sent by the client.
+    """
+    if not config.INGEST_TOKEN:
+        return jsonify({'error': 'Ingestion is disabled (no INGEST_TOKEN configured)'}), 503
+    if not hmac.compare_digest(request.headers.get('Authorization', ''),
+                               f"Bearer {config.INGEST_TOKEN}"):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    upload = request.files.get('file')
+    data = upload.read() if upload else request.get_data()
+    if not data:
+        return jsonify({'error': 'No chat text in the request'}), 400
+    
+    job = ingest.submit(data)
+    response = jsonify(job)
+    response.status_code = 202
+    response.headers['Location'] = url_for('api_ingest_status', job_id=job['id'])
+    return response
+
+
+@app.route('/api/ingest/<job_id>')
+def api_ingest_status(job_id):
+    """Status of an ingestion job"""
+    job = ingest.get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+
+@app.route('/api/players/<name>/stats')
+def api_player_stats(name):
+    """
+    Statistics for one player, over all holes or the dates given by the
+    optional 'from' and 'to' (YYMMDD) query parameters
+    """
+    store, stats = player_stats.get_player_stats()
+    column = resolve_competitor_columns([{'name': name}], store)[0]
+    if column is None:
+        return jsonify({'error': 'Player not found'}), 404
     
-    return render_template('skins.html', 
-                         rounds=rounds_with_skins, 
-                         players=player_names)
+    start_date = request.args.get('from')
+    end_date = request.args.get('to')
+    start = store.find_date_range(start_date)[0] if start_date else 0
+    stop = store.find_date_range('', end_date)[1] if end_date else store.hole_count
+    stop = max(start, stop)
+    
+    result = {
+        'player': store.players[column],
+        'from': store.date_key(start) if start < stop else start_date,
+        'to': store.date_key(stop - 1) if start < stop else end_date
+    }
+    result.update(stats.summary(column, start, stop))
+    return jsonify(result)
+
+
+
+@app.route('/api/players/<name>/scores')
+def api_player_scores(name):
+    """
+    One player's score on every hole, or on the dates given by the optional
+    'from' and 'to' (YYMMDD) query parameters
+    """
+    found = player_stats.get_player_scores(name, request.args.get('from'),
+                                           request.args.get('to'))
+    if found is None:
+        return jsonify({'error': 'Player not found'}), 404
+    player, scores = found
+    return jsonify({'player': player, 'scores': scores})
 
 
 if __name__ == '__main__':
@@ -146,13 +251,18 @@ if __name__ == '__main__':
         print(f"Round {i}:")
         print(f"  Start Date: {round_data['start_date']}")
         print(f"  End Date: {round_data['end_date']}")
-        print(f"  Number of Holes: {len(round_data['holes'])}")
+        print(f"  Number of Holes: {round_data['total_holes']}")
         print()
     
     print(f"\nTotal Rounds Found: {len(rounds)}")
     print(f"Players: {', '.join(player_names)}")
     print("\n" + "="*50 + "\n")
     
+    # Pick up new scores and round changes as they are written
+    if config.WATCH_SOURCES:
+        import source_watcher
+        source_watcher.start()
+    
     # Start the web server
     # host='0.0.0.0' allows access from any network interface
     # Using port 8080 instead of 5000
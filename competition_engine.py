@@ -0,0 +1,212 @@
+"""
+Competition Engine Module
+Registry of competition types, each a per-hole reducer, evaluated together
+in a single pass over a round's holes
+"""
+
+import skins_engine
+
+
+class Competition:
+    """
+    Base class for a competition
+
+    A competition is created for one round and fed that round's holes in
+    order with add_hole; result() then gives its standings. Register new
+    competitions in COMPETITIONS.
+    """
+
+    # Registry name stored in round configs, and the name shown to users
+    name = None
+    title = None
+
+    def __init__(self, players, teams):
+        """
+        Args:
+            players: Competitor names, in the order scores are given
+            teams: Team of each competitor, in the same order
+        """
+        self.players = players
+        self.teams = teams
+
+    def add_hole(self, scores):
+        """Add one hole's scores (bytes, one score per competitor)"""
+        raise NotImplementedError
+
+    def result(self):
+        """
+        Returns:
+            dict: 'title', 'value_label' and 'standings', a list of
+                  {'name', 'value'} (plus an optional 'detail') best first
+        """
+        raise NotImplementedError
+
+
+class Skins(Competition):
+    """
+    Lowest score alone wins the hole and every point carried to it
+
+    The carry-over rules live in skins_engine; this reducer feeds a skins
+    state from there, so the round's skins standings, hole winners and
+    persisted state all come from the same pass as the other competitions.
+    """
+
+    name = 'skins'
+    title = 'Skins'
+
+    def __init__(self, players, teams, state=None):
+        """
+        Args:
+            state: A skins state already holding the round's first holes
+                   (see skins_engine.state_matches); those holes are skipped
+        """
+        super().__init__(players, teams)
+        self.state = state or skins_engine.new_skins_state(players)
+        self.skip = self.state['last_hole']
+
+    def add_hole(self, scores):
+        if self.skip:
+            self.skip -= 1
+            return
+        skins_engine.append_hole(self.state, scores)
+
+    def result(self):
+        standings = sorted(({'name': name, 'value': self.state['skins'][name]}
+                            for name in self.players),
+                           key=lambda standing: -standing['value'])
+        return {'title': self.title, 'value_label': 'Skins', 'standings': standings,
+                'pot_carried': self.state['pot']}
+
+
+class StrokePlay(Competition):
+    """Fewest total strokes over the round"""
+
+    name = 'stroke'
+    title = 'Stroke Play'
+
+    def __init__(self, players, teams):
+        super().__init__(players, teams)
+        self.totals = [0] * len(players)
+
+    def add_hole(self, scores):
+        totals = self.totals
+        for i, score in enumerate(scores):
+            totals[i] += score
+
+    def result(self):
+        standings = sorted(({'name': name, 'value': total}
+                            for name, total in zip(self.players, self.totals)),
+                           key=lambda standing: standing['value'])
+        return {'title': self.title, 'value_label': 'Strokes', 'standings': standings}
+
+
+class BestBall(Competition):
+    """Team competition: each hole counts the best score in the team"""
+
+    name = 'best_ball'
+    title = 'Team Best Ball'
+
+    def __init__(self, players, teams):
+        super().__init__(players, teams)
+        self.team_names = list(dict.fromkeys(teams))
+        team_index = {team: i for i, team in enumerate(self.team_names)}
+        self.member_teams = [team_index[team] for team in teams]
+        self.totals = [0] * len(self.team_names)
+
+    def add_hole(self, scores):
+        best = [None] * len(self.team_names)
+        for team, score in zip(self.member_teams, scores):
+            if best[team] is None or score < best[team]:
+                best[team] = score
+        for team, score in enumerate(best):
+            self.totals[team] += score
+
+    def result(self):
+        standings = sorted(({'name': team, 'value': total}
+                            for team, total in zip(self.team_names, self.totals)),
+                           key=lambda standing: standing['value'])
+        return {'title': self.title, 'value_label': 'Team Strokes', 'standings': standings}
+
+
+class MatchPlay(Competition):
+    """
+    Head-to-head match play between every pair of competitors
+
+    Each pair plays a match over the round's holes: the lower score wins a
+    hole, and the player who wins more holes wins the match. Standings
+    count a match win as 1 point and a halved match as half a point.
+    """
+
+    name = 'match_play'
+    title = 'Match Play'
+
+    def __init__(self, players, teams):
+        super().__init__(players, teams)
+        count = len(players)
+        self.pairs = [(a, b) for a in range(count) for b in range(a + 1, count)]
+        # Holes up for the first player of each pair (negative when down)
+        self.holes_up = [0] * len(self.pairs)
+
+    def add_hole(self, scores):
+        holes_up = self.holes_up
+        for i, (a, b) in enumerate(self.pairs):
+            if scores[a] < scores[b]:
+                holes_up[i] += 1
+            elif scores[b] < scores[a]:
+                holes_up[i] -= 1
+
+    def result(self):
+        records = [[0, 0, 0] for _ in self.players]  # Won, halved, lost
+        matches = []
+        for (a, b), up in zip(self.pairs, self.holes_up):
+            if up > 0:
+                records[a][0] += 1
+                records[b][2] += 1
+            elif up < 0:
+                records[b][0] += 1
+                records[a][2] += 1
+            else:
+                records[a][1] += 1
+                records[b][1] += 1
+            matches.append({'players': [self.players[a], self.players[b]], 'holes_up': up})
+
+        standings = sorted(({'name': name, 'value': won + halved / 2,
+                             'detail': f"{won}-{halved}-{lost}"}
+                            for name, (won, halved, lost) in zip(self.players, records)),
+                           key=lambda standing: -standing['value'])
+        return {'title': self.title, 'value_label': 'Points (W-H-L)', 'standings': standings,
+                'matches': matches}
+
+
+# Available competitions by name, in the order they are offered
+COMPETITIONS = {competition.name: competition
+                for competition in (Skins, StrokePlay, BestBall, MatchPlay)}
+
+
+def run_competitions(competition_names, players, teams, holes, skins_state=None):
+    """
+    Feed a round's holes to several competitions in one pass
+
+    Args:
+        competition_names: Names from COMPETITIONS (unknown names are skipped)
+        players: Competitor names, in score order
+        teams: Team of each competitor, in the same order
+        holes: Scores of every hole (bytes, one score per competitor)
+        skins_state: Existing skins state to continue (see Skins)
+
+    Returns:
+        dict: The fed competition of each name
+    """
+    reducers = {}
+    for name in competition_names:
+        if name in COMPETITIONS and name not in reducers:
+            if name == Skins.name:
+                reducers[name] = Skins(players, teams, skins_state)
+            else:
+                reducers[name] = COMPETITIONS[name](players, teams)
+    for scores in holes:
+        for reducer in reducers.values():
+            reducer.add_hole(scores)
+    return reducers
+
+# Made with Bob
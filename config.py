@@ -23,7 +23,77 @@ TEAMS = ["Dub", "Mucker"]
 # Default score when a player doesn't have an entry
 DEFAULT_SCORE = 8
 
+# Score recorded for a failed game (X)
+FAILED_SCORE = 7
+
 # Number of holes per round (typically)
 HOLES_PER_ROUND = 18
 
+# Where round configurations are stored: "files" (rounds/<YYMMDD>/config.json)
+# or "sqlite" (the database at SQLITE_PATH, see sqlite_store.py)
+STORAGE_BACKEND = "files"
+SQLITE_PATH = "wordle.db"
+
+# Maximum number of score files (or versions of one file) whose parsed
+# rounds and results are kept in memory
+SCORE_CACHE_SIZE = 4
+
+# API responses at least this many bytes are gzip-compressed for clients
+# that accept it
+GZIP_MIN_SIZE = 1024
+
+# Live round updates (Server-Sent Events): how often each viewer's browser
+# reconnects to check for new holes (every check is a short request, so
+# viewers do not hold server threads between checks)
+LIVE_POLL_SECONDS = 5
+
+# Maximum number of rendered HTML fragments (one per round on /skins and
+# per round page) kept in memory
+FRAGMENT_CACHE_SIZE = 2048
+
+# Recomputing all active rounds (round_results.recompute_rounds): worker
+# pool type ("thread" or "process") and size (None for the default)
+RECOMPUTE_MODE = "thread"
+RECOMPUTE_WORKERS = None
+
+# Load the scores once in the gunicorn master before the
+# workers are forked, so they share one snapshot (see gunicorn.conf.py)
+PRELOAD_SCORES = True
+
+# Score ingestion (POST /api/ingest): where job status files are kept and
+# for how long, the largest accepted upload, and the token clients must send
+# as 'Authorization: Bearer <token>'. Ingestion is refused until a token is set.
+INGEST_JOBS_DIR = "ingest_jobs"
+INGEST_JOB_TTL_SECONDS = 24 * 60 * 60
+INGEST_MAX_BYTES = 50 * 1024 * 1024
+INGEST_TOKEN = None
+
+# Source watcher (source_watcher.py): when enabled, changes under
+# WATCH_DIRS are picked up as they happen. New messages in a WhatsApp export
+# listed in SOURCE_EXPORTS ({export path: scores CSV}) are merged into its
+# scores CSV, and only the rounds whose scores or configuration changed are
+# recomputed. Only list an export whose chat the CSV is kept from, e.g.
+# {"sourceData/whatsappWordleDump.txt": SPREADSHEET_PATH} once that export
+# is the live chat.
+WATCH_SOURCES = False
+WATCH_DIRS = ["sourceData", "rounds"]
+SOURCE_EXPORTS = {}
+WATCH_DEBOUNCE_SECONDS = 1.0
+WATCH_POLL_SECONDS = 2.0
+
+# Win projection for in-progress rounds (win_projection.py): simulated
+# finishes shown on the round page, the largest number an API request may
+# ask for, simulations per batch (more than one batch runs in a process pool
+# of PROJECTION_WORKERS, None for one per CPU) and how many recent holes each
+# player's scores are sampled from
+PROJECTION_SIMULATIONS = 20000
+PROJECTION_MAX_SIMULATIONS = 100000
+PROJECTION_BATCH_SIZE = 50000
+PROJECTION_WORKERS = None
+PROJECTION_HISTORY_HOLES = 90
+
+# Request timing: per-phase Server-Timing headers and a Prometheus /metrics
+# endpoint (see metrics.py). Read at startup; off costs nothing per request.
+METRICS_ENABLED = False
+
 # Made with Bob
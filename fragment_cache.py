@@ -0,0 +1,64 @@
+"""
+Fragment Cache Module
+Rendered HTML fragments, keyed on the data they were rendered from, so a
+page only re-renders the parts whose data changed
+"""
+
+import threading
+from collections import OrderedDict
+from flask import render_template
+from markupsafe import Markup
+import config
+import metrics
+
+# Rendered fragments by (template name, key), least recently used first
+_fragments = OrderedDict()
+
+_lock = threading.Lock()
+
+# Hit/miss counters for monitoring
+stats = {'hits': 0, 'misses': 0}
+metrics.register_cache('fragments', stats)
+
+
+def render(template_name, key, **context):
+    """
+    Render a template fragment, or return the cached rendering for this key
+
+    The key must identify everything the fragment shows (e.g. a round's
+    results hash): a fragment is only rendered again when its key changes
+    or it has been evicted.
+
+    Args:
+        template_name: Fragment template, e.g. '_skins_round.html'
+        key: Hashable key for the data being rendered
+        **context: Template variables
+
+    Returns:
+        Markup: Rendered HTML, safe to insert into a page template
+    """
+    cache_key = (template_name, key)
+    with _lock:
+        html = _fragments.get(cache_key)
+        if html is not None:
+            _fragments.move_to_end(cache_key)
+            stats['hits'] += 1
+            return html
+        stats['misses'] += 1
+
+    # Rendered outside the lock; two requests may render the same fragment
+    with metrics.phase('fragment'):
+        html = Markup(render_template(template_name, **context))
+    with _lock:
+        _fragments[cache_key] = html
+        while len(_fragments) > config.FRAGMENT_CACHE_SIZE:
+            _fragments.popitem(last=False)
+    return html
+
+
+def invalidate():
+    """Drop all cached fragments (e.g. after a template change)"""
+    with _lock:
+        _fragments.clear()
+
+# Made with Bob
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Generate synthetic data for benchmarking: WhatsApp exports, score CSVs and
+round directories of configurable size.
+"""
+
+import os
+import csv
+import json
+import random
+import argparse
+from datetime import datetime, timedelta
+
+# Emoji grid rows posted after each Wordle score
+GRID_ROWS = ['⬜🟨🟨⬜⬜', '🟨⬜🟩⬜⬜', '⬜⬜🟩⬜🟩', '⬜⬜🟩🟨🟩', '🟩🟩🟩⬜🟩', '🟩🟩🟩🟩🟩']
+
+CHATTER = [
+    "Tough one today",
+    "Can't believe I missed that",
+    "Wordle is getting harder",
+    "GML",
+    "Who's winning the skins?",
+    "Ditto",
+]
+
+# Scores weighted roughly like real results (index 6 is X, a failed game)
+SCORE_WEIGHTS = [1, 5, 25, 35, 22, 9, 3]
+
+
+def player_names(count):
+    """Synthetic player names"""
+    return [f"Player {i:03d}" for i in range(1, count + 1)]
+
+
+def random_score(rng):
+    """Random Wordle result: '1'-'6' or 'X'"""
+    return rng.choices(['1', '2', '3', '4', '5', '6', 'X'], weights=SCORE_WEIGHTS)[0]
+
+
+def generate_whatsapp_export(path, lines, players, seed=0):
+    """
+    Write a synthetic WhatsApp export of roughly the given number of lines
+
+    Each day every player has a chance to post a score (one score line, a
+    blank line and the six emoji-grid lines) and some chatter.
+
+    Returns:
+        int: Number of score messages written
+    """
+    rng = random.Random(seed)
+    names = player_names(players)
+    day = datetime(2024, 4, 3)
+    puzzle = 1019
+    written = 0
+    scores = 0
+
+    with open(path, 'w', encoding='utf-8') as f:
+        while written < lines:
+            date_str = day.strftime('%d/%m/%Y')
+            for name in names:
+                if rng.random() < 0.7:
+                    time_str = f"{rng.randint(6, 22):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}"
+                    f.write(f"[{date_str}, {time_str}] {name}: Wordle {puzzle:,} {random_score(rng)}/6\n\n")
+                    f.write('\n'.join(GRID_ROWS[-rng.randint(1, 6):]) + '\n')
+                    written += 8
+                    scores += 1
+                if rng.random() < 0.5:
+                    time_str = f"{rng.randint(6, 22):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}"
+                    f.write(f"[{date_str}, {time_str}] {name}: {rng.choice(CHATTER)}\n")
+                    written += 1
+            day += timedelta(days=1)
+            puzzle += 1
+    return scores
+
+
+def generate_scores_csv(path, holes, players, seed=0):
+    """Write a synthetic scores CSV in the format produced by parse_wordle_scores.py"""
+    rng = random.Random(seed)
+    names = player_names(players)
+    day = datetime(2024, 4, 3)
+
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Date', 'Hole'] + [''] * players)
+        writer.writerow(['Date', 'Hole'] + names)
+        for i in range(holes):
+            row = [day.strftime('%y%m%d'), str(i % 18 + 1)]
+            for _ in names:
+                # Players who did not post get the default score of 8
+                score = random_score(rng) if rng.random() < 0.8 else '8'
+                row.append('7' if score == 'X' else score)
+            writer.writerow(row)
+            day += timedelta(days=1)
+
+
+def generate_rounds(rounds_dir, count, players):
+    """Write count round directories with config.json files, one week apart"""
+    names = player_names(players)
+    day = datetime(2024, 4, 3)
+    for _ in range(count):
+        round_date = day.strftime('%y%m%d')
+        round_dir = os.path.join(rounds_dir, round_date)
+        os.makedirs(round_dir, exist_ok=True)
+        round_config = {
+            'round_date': round_date,
+            'round_date_formatted': day.strftime("%B %d, %Y"),
+            'start_date': day.isoformat(),
+            'competitors': [{'name': name, 'team': 'Dub' if i % 2 else 'Mucker'}
+                            for i, name in enumerate(names)],
+            'teams': ['Dub', 'Mucker'],
+            'competitions': ['skins'],
+            'created_at': day.isoformat(),
+            'status': 'completed',
+            'version': 1
+        }
+        with open(os.path.join(round_dir, 'config.json'), 'w') as f:
+            json.dump(round_config, f, indent=2)
+        day += timedelta(days=7)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate synthetic benchmark data')
+    parser.add_argument('output_dir')
+    parser.add_argument('--lines', type=int, default=1000000, help='Chat lines in the export')
+    parser.add_argument('--players', type=int, default=500, help='Number of players')
+    parser.add_argument('--holes', type=int, default=5000, help='Score rows in the CSV')
+    parser.add_argument('--rounds', type=int, default=200, help='Number of round directories')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    scores = generate_whatsapp_export(os.path.join(args.output_dir, 'whatsapp.txt'),
+                                      args.lines, args.players, args.seed)
+    print(f"Wrote WhatsApp export with {scores} scores")
+    generate_scores_csv(os.path.join(args.output_dir, 'scores.csv'),
+                        args.holes, args.players, args.seed)
+    print(f"Wrote scores CSV with {args.holes} holes x {args.players} players")
+    generate_rounds(os.path.join(args.output_dir, 'rounds'), args.rounds, args.players)
+    print(f"Wrote {args.rounds} rounds")
+
+# Made with Bob
@@ -0,0 +1,49 @@
+"""
+Gunicorn settings, read automatically when gunicorn starts in this directory
+
+With PRELOAD_SCORES in config.py the app is imported in the master process
+and the score snapshot (the memory-mapped score store and skins results) is
+built there once. Workers are forked from the master and share it, so adding
+workers or recycling them does not add parse time or memory. When the
+scores CSV changes, the first worker to notice publishes a new generation
+of the store file and the others map it.
+"""
+
+import gc
+# Not imported as 'config', which gunicorn would read as its own setting
+import config as wordle_config
+
+preload_app = wordle_config.PRELOAD_SCORES
+
+
+def when_ready(server):
+    """
+    Warm the score snapshot in the master, before any workers are forked
+
+    Only the scores are loaded here; nothing is written and no requests are
+    made. A missing or malformed scores file is logged and the server starts
+    without the snapshot (each worker then loads the scores on first use).
+    """
+    if not wordle_config.PRELOAD_SCORES:
+        return
+    import score_cache
+
+    try:
+        score_cache.preload()
+    except Exception:
+        server.log.exception("Could not preload the scores; starting without a shared snapshot")
+        return
+    server.log.info("Preloaded scores from %s", wordle_config.SPREADSHEET_PATH)
+
+    # Move everything loaded so far out of the garbage collector's reach, so
+    # collections in the workers do not touch (and copy) the shared pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    """Start the source watcher in each worker, which then trusts its cached scores until they change"""
+    if wordle_config.WATCH_SOURCES:
+        import source_watcher
+        source_watcher.start()
+
+# Made with Bob
@@ -0,0 +1,241 @@
+"""
+Ingest Module
+Background queue that parses uploaded WhatsApp chat text and merges the
+scores into the scores CSV
+"""
+
+import os
+import json
+import time
+import uuid
+import fcntl
+import queue
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import config
+import parse_wordle_scores
+import round_manager
+import round_results
+import score_cache
+
+# A job whose worker died is run again at most this many times in all
+MAX_ATTEMPTS = 3
+
+_queue = queue.Queue()
+_lock = threading.Lock()
+_worker = None
+_recovered_pid = None
+
+# Single process that parses and merges payloads, so ingestion never holds
+# the GIL of the process serving requests (spawned rather than forked, as
+# the web process runs request threads)
+_pool = None
+
+
+def _parse_and_merge(data, csv_path):
+    """Pool process: parse chat text and merge its scores into the CSV"""
+    results = parse_wordle_scores.parse_chunk(data, 0, len(data))
+    return parse_wordle_scores.merge_scores(csv_path, results)
+
+
+def get_job_path(job_id, extension='.json'):
+    """Get path to a job's status file (or its chat text, extension='.data', or lock, '.lock')"""
+    return os.path.join(config.INGEST_JOBS_DIR, job_id + extension)
+
+
+def _claim(job_id):
+    """
+    Take a job's lock without waiting
+
+    The lock is held by the process that will run the job for as long as
+    it is queued or running, and is released by the OS if that process
+    dies, so a queued job whose lock is free was lost.
+
+    Returns:
+        file: The open lock file, or None if another process holds the lock
+    """
+    lock_file = open(get_job_path(job_id, '.lock'), 'a')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        return None
+    return lock_file
+
+
+def _release(job_id, lock_file):
+    """Delete a finished job's chat text and lock"""
+    for extension in ('.data', '.lock'):
+        try:
+            os.remove(get_job_path(job_id, extension))
+        except FileNotFoundError:
+            pass
+    lock_file.close()
+
+
+def _update(job, **fields):
+    """
+    Update a job and publish its status
+
+    Status is kept in a file rather than in memory, so any gunicorn worker
+    can answer a status request for a job queued in another.
+    """
+    job.update(fields)
+    with round_manager.atomic_open(get_job_path(job['id'])) as f:
+        json.dump(job, f)
+
+
+def remove_expired_jobs():
+    """Delete status files of jobs created more than config.INGEST_JOB_TTL_SECONDS ago"""
+    cutoff = time.time() - config.INGEST_JOB_TTL_SECONDS
+    for name in os.listdir(config.INGEST_JOBS_DIR):
+        path = os.path.join(config.INGEST_JOBS_DIR, name)
+        if name.endswith('.json') and os.path.getmtime(path) < cutoff:
+            os.remove(path)
+
+
+def _run_job(job, data):
+    """Parse, merge and refresh the affected rounds for one job"""
+    global _pool
+    csv_path = config.SPREADSHEET_PATH
+    try:
+        _update(job, status='running', stage='merging', started_at=time.time())
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=1,
+                                        mp_context=multiprocessing.get_context('spawn'))
+        merged = _pool.submit(_parse_and_merge, data, csv_path).result()
+
+        _update(job, stage='refreshing', scores=merged['scores'],
+                new_dates=merged['new_dates'], new_players=merged['new_players'])
+        score_cache.invalidate(csv_path)
+        store = score_cache.get_scores(csv_path)['store']
+        combined = round_results.recompute_rounds(round_results.get_rounds_for_dates(merged['dates'], store))
+
+        _update(job, status='done', stage=None, finished_at=time.time(),
+                rounds_refreshed=sorted(combined['results']),
+                round_errors=combined['errors'])
+    except Exception as e:
+        if isinstance(e, BrokenProcessPool):
+            _pool = None  # Start a new process for the next job
+        _update(job, status='failed', stage=None, finished_at=time.time(), error=str(e))
+
+
+def _work():
+    """Worker thread: run queued jobs one at a time"""
+    while True:
+        job, data, lock_file = _queue.get()
+        try:
+            _run_job(job, data)
+        finally:
+            _release(job['id'], lock_file)
+            _queue.task_done()
+
+
+def _read_job(job_id):
+    """Read a job's status file, or None if there is none"""
+    try:
+        with open(get_job_path(job_id), 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def recover_jobs():
+    """
+    Queue again the jobs whose process stopped before finishing them
+
+    Jobs are lost when a gunicorn worker is recycled or crashes with jobs
+    still queued. Their chat text is kept until they finish, so they are
+    run again here (merging the same scores twice is harmless), unless they
+    have already been tried MAX_ATTEMPTS times, in which case they fail.
+    """
+    for name in os.listdir(config.INGEST_JOBS_DIR):
+        if not name.endswith('.json'):
+            continue
+        job = _read_job(name[:-len('.json')])
+        if not job or job.get('status') not in ('queued', 'running'):
+            continue
+        lock_file = _claim(job['id'])
+        if lock_file is None:
+            continue
+
+        # The job may have finished between reading its status and taking the lock
+        job = _read_job(job['id'])
+        if not job or job.get('status') not in ('queued', 'running'):
+            _release(job['id'] if job else name[:-len('.json')], lock_file)
+            continue
+        try:
+            with open(get_job_path(job['id'], '.data'), 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            data = None
+        if data is None or job.get('attempts', 1) >= MAX_ATTEMPTS:
+            _update(job, status='failed', stage=None, finished_at=time.time(),
+                    error='The worker running this job stopped before it finished')
+            _release(job['id'], lock_file)
+            continue
+        _update(job, status='queued', stage=None, attempts=job.get('attempts', 1) + 1)
+        _queue.put((job, data, lock_file))
+
+
+def _start():
+    """Start this process's worker thread and pick up lost jobs, once per process"""
+    global _worker, _recovered_pid
+    os.makedirs(config.INGEST_JOBS_DIR, exist_ok=True)
+    with _lock:
+        # Started on first use, so that under gunicorn's preload the thread
+        # runs in each worker rather than in the master
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_work, name='ingest', daemon=True)
+            _worker.start()
+        recover = _recovered_pid != os.getpid()
+        _recovered_pid = os.getpid()
+    if recover:
+        recover_jobs()
+
+
+def submit(data):
+    """
+    Queue chat text for ingestion and return immediately
+
+    The chat text is kept in the jobs directory until the job finishes, so
+    the job survives its worker being restarted (see recover_jobs).
+
+    Args:
+        data: WhatsApp export, or the newest part of one, as bytes
+
+    Returns:
+        dict: The new job (see get_job)
+    """
+    _start()
+    remove_expired_jobs()
+
+    job = {'id': uuid.uuid4().hex, 'bytes': len(data), 'created_at': time.time(), 'attempts': 1}
+    # Locked before it is published, so no other process sees it as lost
+    lock_file = _claim(job['id'])
+    with open(get_job_path(job['id'], '.data'), 'wb') as f:
+        f.write(data)
+    _update(job, status='queued', stage=None)
+    _queue.put((job, data, lock_file))
+    return dict(job)
+
+
+def get_job(job_id):
+    """
+    Get the status of an ingestion job
+
+    Returns:
+        dict: Job with 'status' (queued, running, done or failed), the
+              current 'stage' while running, and when done the number of
+              scores merged, new dates and players and the refreshed rounds;
+              None if the job is unknown
+    """
+    # Job ids are hex strings; anything else cannot name a status file
+    if not job_id.isalnum():
+        return None
+    _start()
+    return _read_job(job_id)
+
+# Made with Bob
@@ -0,0 +1,122 @@
+"""
+Live Updates Module
+Server-Sent Events with the skins changes of an active round
+"""
+
+import json
+import config
+import round_manager
+import round_results
+import score_cache
+import skins_engine
+
+
+def format_event(event, data, event_id=None):
+    """Format one Server-Sent Event"""
+    message = ''
+    if event_id is not None:
+        message += f"id: {event_id}\n"
+    return message + f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def get_standings(state):
+    """Current skins per player, highest first"""
+    return sorted(({'name': name, 'skins': skins} for name, skins in state['skins'].items()),
+                  key=lambda standing: -standing['skins'])
+
+
+def hole_events(state, index, date, event_id):
+    """
+    Build the events for one newly scored hole
+
+    Every hole produces a 'hole' event, followed by a 'skin' event when a
+    player won the pot or a 'carry' event when it carried over.
+    """
+    hole = index + 1
+    winner = state['hole_winners'][index]
+    points = state['hole_points'][index]
+    scores = dict(zip(state['players'], state['hole_scores'][index]))
+
+    yield format_event('hole', {'hole': hole, 'date': date, 'scores': scores,
+                                'winner': winner, 'points': points}, event_id=event_id)
+    if winner:
+        skins = sum(p for w, p in zip(state['hole_winners'][:hole], state['hole_points'])
+                    if w == winner)
+        yield format_event('skin', {'hole': hole, 'player': winner, 'points': points,
+                                    'skins': skins})
+    else:
+        yield format_event('carry', {'hole': hole, 'pot': hole_pot(state, index)})
+
+
+def hole_pot(state, index):
+    """Points in the pot after a hole that was not won"""
+    pot = 0
+    for points in state['hole_points'][:index + 1]:
+        pot = 0 if points else pot + 1
+    return pot
+
+
+def parse_event_id(event_id):
+    """
+    Split an event id into the number of holes the client has and the
+    source hash of the round at that point
+
+    Returns:
+        tuple: (holes, source hash or None); holes is None if the id is not
+               one of ours
+    """
+    holes, _, source_hash = (event_id or '').partition(':')
+    if not holes.isdigit():
+        return None, None
+    return int(holes), source_hash or None
+
+
+def get_round_events(round_date_str, holes_seen=0, source_hash=None):
+    """
+    Build the Server-Sent Events a client has not seen yet
+
+    Each response is short-lived: it carries the holes scored since the
+    client's last event and then ends. The 'retry' field makes the browser's
+    EventSource reconnect after config.LIVE_POLL_SECONDS, sending the id of
+    the last event it received, so a viewer only holds a server thread for
+    the few milliseconds of each check.
+
+    Event ids are '<holes>:<source hash>'. If the round's scores or
+    configuration changed under holes the client already shows, a
+    'standings' event is sent instead so it can refresh. So is the round's
+    first hole, as a page without holes has no results tables to add it to.
+
+    Args:
+        round_date_str: Round date in YYMMDD format
+        holes_seen: Number of holes the client already shows
+        source_hash: Round source hash (see round_results.get_round_source_hash)
+                     after those holes, if the client knows it
+
+    Returns:
+        str: Event stream body
+    """
+    events = [f"retry: {int(config.LIVE_POLL_SECONDS * 1000)}\n\n"]
+    round_config = round_manager.get_round_config(round_date_str)
+    if not round_config or round_config.get('status') != 'active':
+        events.append(format_event('closed', {'round_date': round_date_str}))
+        return ''.join(events)
+
+    players = [competitor['name'] for competitor in round_config['competitors']]
+    store = score_cache.get_scores()['store']
+    rows, holes = round_results.get_round_scores(round_config, store)
+    state = skins_engine.rebuild_skins_state(players, holes)
+
+    def event_id(hole_count):
+        return f"{hole_count}:{round_results.get_round_source_hash(round_config, holes[:hole_count])}"
+
+    if holes_seen > state['last_hole'] or (holes_seen == 0 and state['last_hole']) or (
+            source_hash is not None and event_id(holes_seen) != f"{holes_seen}:{source_hash}"):
+        events.append(format_event('standings', {'standings': get_standings(state),
+                                                 'pot': state['pot'], 'holes': state['last_hole']},
+                                   event_id=event_id(state['last_hole'])))
+    else:
+        for index in range(holes_seen, state['last_hole']):
+            events.extend(hole_events(state, index, store.date(rows[index]), event_id(index + 1)))
+    return ''.join(events)
+
+# Made with Bob
@@ -0,0 +1,164 @@
+"""
+Metrics Module
+Per-phase request timing (Server-Timing header) and Prometheus-text metrics
+
+Everything here is a no-op unless config.METRICS_ENABLED is set when the
+app starts: phase() then returns a shared do-nothing context manager and no
+request hooks or /metrics route are registered. Metrics are kept per
+process, so with several gunicorn workers each one reports its own.
+"""
+
+import time
+import threading
+from bisect import bisect_left
+from contextlib import nullcontext
+from flask import g, has_request_context, request, Response
+import config
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Histograms by (metric name, label pairs)
+_histograms = {}
+
+# Hit/miss counter dicts of the app's caches, by cache name
+_caches = {}
+
+_lock = threading.Lock()
+
+_NO_PHASE = nullcontext()
+
+
+class Histogram:
+    """Latency histogram with fixed buckets"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last bucket is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def observe(name, labels, value):
+    """Record a value in the histogram for a metric name and label pairs"""
+    key = (name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram()
+        histogram.observe(value)
+
+
+def register_cache(name, stats):
+    """Report a cache's 'hits' and 'misses' counters (a dict updated by the cache)"""
+    _caches[name] = stats
+
+
+class _Phase:
+    """Times one phase of a request"""
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        duration = time.perf_counter() - self.start
+        observe('wordle_phase_seconds', (('phase', self.name),), duration)
+        if has_request_context():
+            g.setdefault('phase_timings', []).append((self.name, duration))
+        return False
+
+
+def phase(name):
+    """
+    Time a phase of work, e.g. ``with metrics.phase('parse'):``
+
+    The duration is added to the phase histogram and, inside a request, to
+    the response's Server-Timing header.
+    """
+    if not config.METRICS_ENABLED:
+        return _NO_PHASE
+    return _Phase(name)
+
+
+def _before_request():
+    g.request_start = time.perf_counter()
+
+
+def _after_request(response):
+    """Record the request latency and add the Server-Timing header"""
+    duration = time.perf_counter() - g.request_start
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    observe('wordle_request_seconds',
+            (('route', route), ('method', request.method), ('status', str(response.status_code))),
+            duration)
+
+    # Streamed responses are timed up to the first byte
+    timings = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in g.get('phase_timings', [])]
+    timings.append(f"total;dur={duration * 1000:.1f}")
+    response.headers['Server-Timing'] = ', '.join(timings)
+    return response
+
+
+def format_labels(labels):
+    """Format label pairs as {name="value",...}"""
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in labels) + '}'
+
+
+def render_metrics():
+    """Render all metrics in the Prometheus text exposition format"""
+    lines = []
+    with _lock:
+        histograms = sorted(_histograms.items())
+        snapshot = [(key, list(h.counts), h.sum, h.count, h.buckets) for key, h in histograms]
+
+    seen = set()
+    for (name, labels), counts, total, count, buckets in snapshot:
+        if name not in seen:
+            lines.append(f"# TYPE {name} histogram")
+            seen.add(name)
+        cumulative = 0
+        for bound, bucket_count in zip(buckets + ('+Inf',), counts):
+            cumulative += bucket_count
+            lines.append(f"{name}_bucket{format_labels(labels + (('le', str(bound)),))} {cumulative}")
+        lines.append(f"{name}_sum{format_labels(labels)} {total}")
+        lines.append(f"{name}_count{format_labels(labels)} {count}")
+
+    for metric in ('hits', 'misses'):
+        lines.append(f"# TYPE wordle_cache_{metric}_total counter")
+        for cache, stats in sorted(_caches.items()):
+            lines.append(f"wordle_cache_{metric}_total{format_labels((('cache', cache),))} "
+                         f"{stats[metric]}")
+    lines.append("# TYPE wordle_cache_hit_ratio gauge")
+    for cache, stats in sorted(_caches.items()):
+        lookups = stats['hits'] + stats['misses']
+        ratio = stats['hits'] / lookups if lookups else 0.0
+        lines.append(f"wordle_cache_hit_ratio{format_labels((('cache', cache),))} {ratio}")
+
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view():
+    """Prometheus scrape endpoint"""
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+
+def init_app(app):
+    """Register the request timing hooks and the /metrics route if metrics are enabled"""
+    if not config.METRICS_ENABLED:
+        return
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
+
+# Made with Bob
@@ -4,39 +4,570 @@ Parse WhatsApp Wordle dump and generate CSV file with scores.
 """
 
 import re
+import os
 import csv
+import json
+import mmap
+import hashlib
+import tempfile
+import argparse
 from datetime import datetime
 from collections import OrderedDict
+from contextlib import contextmanager
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+import config
+import round_manager
+import sqlite_store
+
+INPUT_FILE = '/Users/joc/Education/WordleWithBob/sourceData/whatsappWordleDump.txt'
+OUTPUT_FILE = '/Users/joc/Education/WordleWithBob/sourceData/Wordler Skins Parse Inputs - Scores.csv'
+
+# Number of bytes before the checkpoint offset that are hashed to detect
+# a re-export whose history no longer matches what was already parsed
+CHECKPOINT_TAIL_BYTES = 4096
+
+# Pattern to match the timestamp at the start of every WhatsApp message
+TIMESTAMP_PATTERN = re.compile(r'\[(\d{2}/\d{2}/\d{4}, \d{2}:\d{2}:\d{2})\]')
+
+# Pattern to match Wordle score lines
+WORDLE_PATTERN = re.compile(r'\[(\d{2}/\d{2}/\d{4}), \d{2}:\d{2}:\d{2}\] ([^:]+): Wordle \d+[,\d]* ([X\d])/6')
+
+# Literal every Wordle score line contains; only lines holding it reach the regex
+WORDLE_MARKER = b'Wordle '
+
+# Bulk parsing splits the export into chunks of roughly this many bytes, and
+# exports smaller than one chunk are parsed without starting a process pool
+BULK_CHUNK_SIZE = 4 * 1024 * 1024
+
+@lru_cache(maxsize=4096)
+def format_message_date(date_str):
+    """Convert a DD/MM/YYYY message date to YYMMDD (cached, as every score repeats it)"""
+    return datetime.strptime(date_str, '%d/%m/%Y').strftime('%y%m%d')
 
 def parse_wordle_line(line):
     """
     Parse a line like: [03/04/2024, 11:17:40] Lorcan Kavanagh: Wordle 1,019 6/6
     Returns: (date, player_name, score) or None if not a valid Wordle line
     """
-    # Pattern to match Wordle score lines
-    pattern = r'\[(\d{2}/\d{2}/\d{4}), \d{2}:\d{2}:\d{2}\] ([^:]+): Wordle \d+[,\d]* ([X\d])/6'
-    
-    match = re.search(pattern, line)
+    match = WORDLE_PATTERN.search(line)
     if match:
         date_str = match.group(1)  # DD/MM/YYYY
         player_name = match.group(2).strip()
         score = match.group(3)
         
         # Convert date to YYMMDD format
-        date_obj = datetime.strptime(date_str, '%d/%m/%Y')
-        formatted_date = date_obj.strftime('%y%m%d')
+        formatted_date = format_message_date(date_str)
         
-        # Convert X to 7
+        # Convert X to the failed-game score
         if score == 'X':
-            score = '7'
+            score = str(config.FAILED_SCORE)
         
         return (formatted_date, player_name, score)
     
     return None
 
-def main():
-    input_file = '/Users/joc/Education/WordleWithBob/sourceData/whatsappWordleDump.txt'
-    output_file = '/Users/joc/Education/WordleWithBob/sourceData/Wordler Skins Parse Inputs - Scores.csv'
+def find_chunk_boundaries(data, start, end, chunk_size=BULK_CHUNK_SIZE):
+    """
+    Split data[start:end] into chunks that each begin at a message boundary
+
+    A message boundary is a newline followed by '[', so multi-line messages
+    (such as the emoji grid after a score) are never split across chunks.
+
+    Returns:
+        list: (chunk_start, chunk_end) byte ranges covering start to end
+    """
+    boundaries = [start]
+    target = start + chunk_size
+    while target < end:
+        boundary = data.find(b'\n[', target, end)
+        if boundary == -1:
+            break
+        boundaries.append(boundary + 1)
+        target = boundary + 1 + chunk_size
+    boundaries.append(end)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+def parse_chunk(data, start, end):
+    """
+    Parse the Wordle scores in data[start:end]
+
+    Only lines containing the literal 'Wordle ' are decoded and matched
+    against the score pattern; all other chat lines are skipped in bulk.
+
+    Returns:
+        list: (date, player, score) tuples in file order
+    """
+    results = []
+    position = data.find(WORDLE_MARKER, start, end)
+    while position != -1:
+        line_start = data.rfind(b'\n', start, position) + 1 or start
+        line_end = data.find(b'\n', position, end)
+        if line_end == -1:
+            line_end = end
+
+        line = data[line_start:line_end].decode('utf-8', errors='replace')
+        result = parse_wordle_line(line)
+        if result:
+            results.append(result)
+
+        position = data.find(WORDLE_MARKER, line_end, end)
+    return results
+
+def _parse_file_chunk(chunk):
+    """Process pool worker: map the export and parse one (path, start, end) chunk"""
+    input_file, start, end = chunk
+    with open(input_file, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return parse_chunk(data, start, end)
+
+def parse_export_bulk(input_file, start_offset=0, end_offset=None, workers=None,
+                      chunk_size=BULK_CHUNK_SIZE):
+    """
+    Parse Wordle scores from a large WhatsApp export in parallel
+
+    The export is memory-mapped and split at message boundaries into chunks
+    which are parsed in a process pool. Results are merged in file order, so
+    the output is identical to parsing the file line by line.
+
+    Args:
+        input_file: Path to the WhatsApp export
+        start_offset: Byte offset to start parsing from
+        end_offset: Byte offset to stop parsing at (defaults to end of file)
+        workers: Number of worker processes (defaults to the CPU count)
+        chunk_size: Approximate size of each chunk in bytes
+
+    Returns:
+        list: (date, player, score) tuples in file order
+    """
+    if end_offset is None:
+        end_offset = os.path.getsize(input_file)
+    if end_offset <= start_offset:
+        return []
+
+    with open(input_file, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            chunks = find_chunk_boundaries(data, start_offset, end_offset, chunk_size)
+            if len(chunks) == 1 or workers == 1:
+                return parse_chunk(data, start_offset, end_offset)
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        tasks = [(input_file, start, end) for start, end in chunks]
+        for chunk_results in executor.map(_parse_file_chunk, tasks):
+            results.extend(chunk_results)
+    return results
+
+def read_scores(input_file, start_offset=0, verbose=False, workers=None):
+    """
+    Parse Wordle scores from the input file starting at a byte offset
+
+    Args:
+        input_file: Path to the WhatsApp export
+        start_offset: Byte offset to start reading from (0 for the whole file)
+        verbose: Print each score as it is found
+        workers: Number of worker processes for bulk parsing
+
+    Returns:
+        tuple: (list of (date, player, score), offset after the last complete
+                line, timestamp of the last message seen or None)
+    """
+    size = os.path.getsize(input_file)
+    if size <= start_offset:
+        return [], start_offset, None
+
+    results = parse_export_bulk(input_file, start_offset, size, workers=workers)
+    if verbose:
+        for date, player, score in results:
+            print(f"Found: {date} - {player}: {score}")
+
+    with open(input_file, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            # An unterminated final line is still parsed, but the checkpoint
+            # stays before it so it is read again once the export grows
+            end_offset = data.rfind(b'\n', start_offset, size) + 1 or start_offset
+
+            # Timestamp of the last message that starts in the parsed range
+            last_timestamp = None
+            message_start = data.rfind(b'\n[', start_offset, size)
+            if message_start != -1:
+                line_end = data.find(b'\n', message_start + 1, size)
+                if line_end == -1:
+                    line_end = size
+                line = data[message_start + 1:line_end].decode('utf-8', errors='replace')
+                timestamp = TIMESTAMP_PATTERN.match(line)
+                if timestamp:
+                    last_timestamp = timestamp.group(1)
+
+    return results, end_offset, last_timestamp
+
+def get_checkpoint_path(output_file):
+    """Get path to the incremental checkpoint stored next to the output CSV"""
+    return output_file + '.checkpoint.json'
+
+def hash_tail(input_file, offset):
+    """Hash the bytes immediately before offset in the input file"""
+    start = max(0, offset - CHECKPOINT_TAIL_BYTES)
+    with open(input_file, 'rb') as f:
+        f.seek(start)
+        return hashlib.sha256(f.read(offset - start)).hexdigest()
+
+def find_last_row_offset(output_file):
+    """Return the byte offset where the last row of the CSV file starts"""
+    size = os.path.getsize(output_file)
+    with open(output_file, 'rb') as f:
+        window = min(size, CHECKPOINT_TAIL_BYTES)
+        f.seek(size - window)
+        tail = f.read(window)
+
+    # Skip the trailing newline of the last row itself
+    newline = tail.rfind(b'\n', 0, len(tail) - 1)
+    return size - window + newline + 1
+
+def save_checkpoint(input_file, output_file, offset, last_timestamp,
+                    players, last_date, last_hole, last_row):
+    """
+    Save the incremental parsing checkpoint
+
+    Args:
+        input_file: Path to the WhatsApp export that was parsed
+        output_file: Path to the CSV file that was written
+        offset: Byte offset in the input file up to which parsing is complete
+        last_timestamp: Timestamp of the last message parsed
+        players: Column order of the players in the CSV
+        last_date: Date of the last row in the CSV
+        last_hole: Hole number of the last row in the CSV
+        last_row: Raw scores of the last row ({player: score}), which may
+                  still receive late scores on the next run
+    """
+    checkpoint = {
+        'input_file': os.path.abspath(input_file),
+        'offset': offset,
+        'last_timestamp': last_timestamp,
+        'tail_hash': hash_tail(input_file, offset),
+        'players': players,
+        'last_date': last_date,
+        'last_hole': last_hole,
+        'last_row': last_row,
+        'last_row_offset': find_last_row_offset(output_file),
+        'output_size': os.path.getsize(output_file),
+    }
+    with open(get_checkpoint_path(output_file), 'w') as f:
+        json.dump(checkpoint, f, indent=2)
+
+def load_checkpoint(input_file, output_file):
+    """
+    Load the checkpoint for output_file if it is still valid for input_file
+
+    The checkpoint is rejected if the output CSV was changed since it was
+    written, or if the bytes before the checkpoint offset in the input file
+    no longer hash to the same value (i.e. the export history was rewritten).
+
+    Returns:
+        dict: Checkpoint data or None if a full rebuild is required
+    """
+    checkpoint_path = get_checkpoint_path(output_file)
+    if not os.path.exists(checkpoint_path) or not os.path.exists(output_file):
+        return None
+
+    with open(checkpoint_path, 'r') as f:
+        checkpoint = json.load(f)
+
+    if os.path.getsize(output_file) != checkpoint['output_size']:
+        return None
+    if os.path.getsize(input_file) < checkpoint['offset']:
+        return None
+    if hash_tail(input_file, checkpoint['offset']) != checkpoint['tail_hash']:
+        return None
+
+    return checkpoint
+
+def format_score_row(date, hole, scores, players):
+    """Build a CSV row for one date, filling missing scores with config.DEFAULT_SCORE"""
+    default_score = str(config.DEFAULT_SCORE)
+    return [date, str(hole)] + [scores.get(player) or default_score for player in players]
+
+def next_hole(hole):
+    """Hole number after hole (reset to 1 after 18)"""
+    return 1 if hole == 18 else hole + 1
+
+def iter_score_rows(scores_by_date, players):
+    """
+    Generate the CSV rows for a scores dictionary
+
+    Row 1 holds team names (empty for now - user will provide instructions
+    later), row 2 the player names and rows 3+ the date, hole number and
+    scores, with missing scores filled in as each row is produced.
+    """
+    yield ['Date', 'Hole'] + [''] * len(players)
+    yield ['Date', 'Hole'] + players
+
+    hole = 1
+    for date in sorted(scores_by_date.keys()):
+        yield format_score_row(date, hole, scores_by_date[date], players)
+
+        hole = next_hole(hole)
+
+@contextmanager
+def open_scores_csv(output_file, atomic=False):
+    """
+    Open a scores CSV for writing
+
+    With atomic=True the rows are written to a temporary file in the same
+    directory and renamed into place when the block exits without error, so
+    readers never see a partially written CSV.
+    """
+    if not atomic:
+        with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
+            yield csvfile
+        return
+
+    fd, write_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(output_file)),
+                                      prefix='.scores-', suffix='.csv.tmp')
+    try:
+        with os.fdopen(fd, 'w', newline='', encoding='utf-8') as csvfile:
+            yield csvfile
+        os.chmod(write_path, 0o644)
+        os.replace(write_path, output_file)
+    except BaseException:
+        if os.path.exists(write_path):
+            os.remove(write_path)
+        raise
+
+def write_scores_csv(output_file, scores_by_date, players, atomic=False):
+    """
+    Write the scores CSV in a single streaming pass
+
+    Args:
+        output_file: Path to the CSV file
+        scores_by_date: Dictionary of {date: {player: score}}
+        players: Column order of the players
+        atomic: Write to a temporary file in the same directory and rename it
+                into place, so readers never see a partially written CSV
+
+    Returns:
+        tuple: (number of score rows written, hole number of the last row)
+    """
+    row_count = 0
+    last_hole = 0
+    with open_scores_csv(output_file, atomic) as csvfile:
+        writer = csv.writer(csvfile)
+        for index, row in enumerate(iter_score_rows(scores_by_date, players)):
+            writer.writerow(row)
+            if index >= 2:
+                row_count += 1
+                last_hole = int(row[1])
+
+    return row_count, last_hole
+
+def sync_score_tables(output_file, dates=None):
+    """
+    Copy the rows just written to the scores CSV into the SQLite score
+    tables, when rounds are stored in SQLite (see sqlite_store.py)
+
+    Args:
+        output_file: Path to the scores CSV
+        dates: Dates whose rows changed (defaults to every row)
+    """
+    if round_manager.use_sqlite():
+        sqlite_store.sync_scores_csv(output_file, dates)
+
+def is_sortable_date(date):
+    """True for YYMMDD dates, whose string order is date order"""
+    return len(date) == 6 and date.isdigit()
+
+def merge_scores(output_file, results, input_file=None, end_offset=None, last_timestamp=None):
+    """
+    Merge newly parsed scores into an existing scores CSV
+
+    The merge is cell by cell: a score for a date already in the CSV
+    replaces that player's cell, a new player becomes a new column (blank,
+    i.e. config.DEFAULT_SCORE, on existing rows) and a new date becomes a
+    new row. Everything else, including the team row, row order and hole
+    numbers, is written back exactly as it was read. A new date goes after
+    the last earlier date (at the end if the dates are not YYMMDD) with the
+    hole number that follows the row before it; later rows keep theirs.
+
+    The CSV is rewritten atomically under a lock, so concurrent merges
+    cannot lose each other's scores. This invalidates the incremental
+    checkpoint unless the results were parsed from an export (input_file),
+    in which case a new checkpoint is saved so the next incremental run
+    resumes after them.
+
+    Args:
+        output_file: Path to the scores CSV (created if it does not exist)
+        results: (date, player, score) tuples from parse_wordle_line
+        input_file: WhatsApp export the results were parsed from, if any
+        end_offset: Byte offset in input_file up to which it was parsed
+        last_timestamp: Timestamp of the last message parsed
+
+    Returns:
+        dict: Number of scores merged, the dates they were for, and the
+              new dates and new players
+    """
+    with round_manager.file_lock(output_file + '.lock'):
+        rows = []
+        line_terminator = '\r\n'  # csv.writer's default, as write_scores_csv uses
+        if os.path.exists(output_file):
+            with open(output_file, 'r', newline='', encoding='utf-8') as f:
+                if not f.readline().endswith('\r\n'):
+                    line_terminator = '\n'
+                f.seek(0)
+                rows = list(csv.reader(f))
+        while len(rows) < 2:
+            rows.append(['Date', 'Hole'])
+        team_row, header_row = rows[0], rows[1]
+        columns = {name.strip(): i for i, name in enumerate(header_row) if i >= 2}
+        date_rows = {row[0].strip(): row for row in rows[2:] if row and row[0].strip()}
+
+        new_players = []
+        new_scores = OrderedDict()
+        for date, player, score in results:
+            if player not in columns:
+                # Existing columns keep their positions; new players are added at the end
+                team_row.extend([''] * (len(header_row) - len(team_row)))
+                team_row.append('')
+                header_row.append(player)
+                columns[player] = len(header_row) - 1
+                new_players.append(player)
+            if date in date_rows:
+                row = date_rows[date]
+                row.extend([''] * (columns[player] + 1 - len(row)))
+                row[columns[player]] = score
+            else:
+                new_scores.setdefault(date, {})[player] = score
+
+        players = [name.strip() for name in header_row[2:]]
+        sortable = all(map(is_sortable_date, date_rows))
+        for date in sorted(new_scores):
+            position = len(rows)
+            if sortable and is_sortable_date(date):
+                while position > 2 and (not rows[position - 1] or
+                                        not rows[position - 1][0].strip() or
+                                        rows[position - 1][0].strip() > date):
+                    position -= 1
+            previous = next((row for row in reversed(rows[2:position])
+                             if row and row[0].strip() and row[1].strip().isdigit()), None)
+            hole = next_hole(int(previous[1])) if previous else 1
+            rows.insert(position, format_score_row(date, hole, new_scores[date], players))
+
+        with open_scores_csv(output_file, atomic=True) as csvfile:
+            csv.writer(csvfile, lineterminator=line_terminator).writerows(rows)
+
+        # A new player's column is blank on every other row, so all rows change
+        sync_score_tables(output_file, None if new_players else
+                          {date for date, _, _ in results})
+
+        last_row = next((row for row in reversed(rows[2:])
+                         if row and row[0].strip() and row[1].strip().isdigit()), None)
+        if input_file is not None and last_row is not None:
+            save_checkpoint(input_file, output_file, end_offset, last_timestamp, players,
+                            last_row[0].strip(), int(last_row[1]),
+                            {player: score for player, score in zip(players, last_row[2:])
+                             if score})
+
+    return {
+        'scores': len(results),
+        'dates': sorted({date for date, _, _ in results}),
+        'new_dates': sorted(new_scores),
+        'new_players': sorted(new_players)
+    }
+
+def update_incremental(input_file, output_file, checkpoint, verbose=False, workers=None):
+    """
+    Parse only the bytes added since the checkpoint and append new holes
+
+    Scores for the date of the last CSV row replace that row; later dates
+    are appended as new holes. Only the new messages are parsed, and the CSV
+    is always replaced atomically.
+
+    Returns:
+        bool: True if the update was applied, False if a full rebuild is
+              required (new player or scores for an earlier date)
+    """
+    print(f"Resuming from byte {checkpoint['offset']} "
+          f"(last message {checkpoint['last_timestamp']})...")
+    results, end_offset, last_timestamp = read_scores(input_file, checkpoint['offset'],
+                                                      verbose=verbose, workers=workers)
+
+    players = checkpoint['players']
+    last_date = checkpoint['last_date']
+
+    new_scores = OrderedDict()
+    new_scores[last_date] = dict(checkpoint['last_row'])
+    for date, player, score in results:
+        if player not in players:
+            print(f"New player {player} found, full rebuild required")
+            return False
+        if date < last_date:
+            print(f"Score for earlier date {date} found, full rebuild required")
+            return False
+        new_scores.setdefault(date, {})[player] = score
+
+    # Rewrite the last row (it may have gained late scores) and append the
+    # rest. The new CSV is the old one up to its last row followed by the new
+    # rows, written to a temporary file and renamed into place under the
+    # same lock as merge_scores, so readers never see a partial CSV.
+    with round_manager.file_lock(output_file + '.lock'):
+        if os.path.getsize(output_file) != checkpoint['output_size']:
+            print("Output CSV changed since the checkpoint, full rebuild required")
+            return False
+        with open(output_file, 'rb') as f:
+            kept_rows = f.read(checkpoint['last_row_offset']).decode('utf-8')
+
+        hole = checkpoint['last_hole']
+        with open_scores_csv(output_file, atomic=True) as csvfile:
+            csvfile.write(kept_rows)
+            writer = csv.writer(csvfile)
+            for date in sorted(new_scores.keys()):
+                if date != last_date:
+                    hole = next_hole(hole)
+                writer.writerow(format_score_row(date, hole, new_scores[date], players))
+
+        sync_score_tables(output_file, new_scores.keys())
+
+        final_date = max(new_scores.keys())
+        save_checkpoint(input_file, output_file, end_offset,
+                        last_timestamp or checkpoint['last_timestamp'],
+                        players, final_date, hole, new_scores[final_date])
+
+    print(f"\nComplete! {len(results)} new scores, "
+          f"{len(new_scores) - 1} new score rows appended")
+    print(f"Output file: {output_file}")
+    return True
+
+def merge_export(input_file, output_file, verbose=False, workers=None):
+    """
+    Bring a scores CSV up to date with an export without ever rewriting it
+
+    New messages are appended incrementally when the checkpoint allows it.
+    Otherwise (no valid checkpoint, a new player or scores for an earlier
+    date) the messages are merged into the CSV with merge_scores, so rows
+    that are not in the export, such as ingested scores or a CSV that runs
+    past the end of the export, are kept.
+    """
+    checkpoint = load_checkpoint(input_file, output_file)
+    if checkpoint is not None and update_incremental(input_file, output_file, checkpoint,
+                                                     verbose, workers):
+        return
+
+    start_offset = checkpoint['offset'] if checkpoint else 0
+    print(f"Merging messages from byte {start_offset} into {output_file}...")
+    results, end_offset, last_timestamp = read_scores(input_file, start_offset,
+                                                      verbose=verbose, workers=workers)
+    summary = merge_scores(output_file, results, input_file, end_offset,
+                           last_timestamp or (checkpoint or {}).get('last_timestamp'))
+    print(f"\nComplete! {summary['scores']} scores merged, "
+          f"{len(summary['new_dates'])} new score rows")
+
+def main(input_file=INPUT_FILE, output_file=OUTPUT_FILE, incremental=False,
+         verbose=False, workers=None, atomic=False):
+    if incremental:
+        checkpoint = load_checkpoint(input_file, output_file)
+        if checkpoint is None:
+            print("No valid checkpoint found, running full parse")
+        elif update_incremental(input_file, output_file, checkpoint, verbose, workers):
+            return
     
     # Dictionary to store scores: {date: {player: score}}
     scores_by_date = OrderedDict()
@@ -47,23 +578,18 @@ def main():
     print("Parsing input file...")
     
     # Read and parse the input file
-    with open(input_file, 'r', encoding='utf-8') as f:
-        for line in f:
-            result = parse_wordle_line(line)
-            if result:
-                date, player, score = result
+    results, end_offset, last_timestamp = read_scores(input_file, verbose=verbose,
+                                                      workers=workers)
+    for date, player, score in results:
+        # Add player to set
+        all_players.add(player)
                 
-                # Add player to set
-                all_players.add(player)
+        # Initialize date entry if not exists
+        if date not in scores_by_date:
+            scores_by_date[date] = {}
                 
-                # Initialize date entry if not exists
-                if date not in scores_by_date:
-                    scores_by_date[date] = {}
-                
-                # Store score for this player on this date
-                scores_by_date[date][player] = score
-                
-                print(f"Found: {date} - {player}: {score}")
+        # Store score for this player on this date
+        scores_by_date[date][player] = score
     
     # Sort players alphabetically for consistent column order
     sorted_players = sorted(all_players)
@@ -71,63 +597,38 @@ def main():
     print(f"\nFound {len(scores_by_date)} dates and {len(sorted_players)} players")
     print(f"Players: {', '.join(sorted_players)}")
     
-    # Create CSV file
+    # Create CSV file, filling missing scores as the rows are produced
     print(f"\nWriting to CSV: {output_file}")
+    with round_manager.file_lock(output_file + '.lock'):
+        row_count, last_hole = write_scores_csv(output_file, scores_by_date, sorted_players,
+                                                atomic=atomic)
+        sync_score_tables(output_file)
     
-    with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
-        # Row 1: Team names (placeholder for now - will be filled in later)
-        # Row 2: Player names
-        # Row 3+: Date, Hole, Scores
-        
-        writer = csv.writer(csvfile)
-        
-        # Row 1: Team names (empty for now - user will provide instructions later)
-        team_row = ['Date', 'Hole'] + [''] * len(sorted_players)
-        writer.writerow(team_row)
-        
-        # Row 2: Player names
-        player_row = ['Date', 'Hole'] + sorted_players
-        writer.writerow(player_row)
-        
-        # Rows 3+: Scores
-        hole = 1
-        for date in sorted(scores_by_date.keys()):
-            row = [date, str(hole)]
-            
-            # Add score for each player (or empty if they didn't play)
-            for player in sorted_players:
-                score = scores_by_date[date].get(player, '')
-                row.append(score)
-            
-            writer.writerow(row)
-            
-            # Increment hole number (reset to 1 after 18)
-            hole = 1 if hole == 18 else hole + 1
-    
-    # Fill in missing scores with 8
-    print("\nFilling missing scores with 8...")
-    
-    # Read the CSV back
-    rows = []
-    with open(output_file, 'r', encoding='utf-8') as csvfile:
-        reader = csv.reader(csvfile)
-        rows = list(reader)
-    
-    # Update rows 3+ (index 2+) to fill empty scores with 8
-    for i in range(2, len(rows)):
-        for j in range(2, len(rows[i])):
-            if rows[i][j] == '':
-                rows[i][j] = '8'
-    
-    # Write back
-    with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
-        writer = csv.writer(csvfile)
-        writer.writerows(rows)
-    
-    print(f"\nComplete! CSV file created with {len(rows) - 2} score rows")
+        # Record where parsing stopped so the next run can resume from there
+        if scores_by_date:
+            last_date = max(scores_by_date.keys())
+            save_checkpoint(input_file, output_file, end_offset, last_timestamp,
+                            sorted_players, last_date, last_hole,
+                            scores_by_date[last_date])
+
+    print(f"\nComplete! CSV file created with {row_count} score rows")
     print(f"Output file: {output_file}")
 
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser(description='Parse a WhatsApp Wordle dump into a scores CSV')
+    parser.add_argument('input_file', nargs='?', default=INPUT_FILE)
+    parser.add_argument('output_file', nargs='?', default=OUTPUT_FILE)
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only parse messages added since the last run')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Number of worker processes for bulk parsing')
+    parser.add_argument('--verbose', action='store_true',
+                        help='Print every score as it is found')
+    parser.add_argument('--atomic', action='store_true',
+                        help='Write the CSV to a temporary file and rename it into place '
+                             '(incremental updates always do)')
+    args = parser.parse_args()
+    main(args.input_file, args.output_file, incremental=args.incremental,
+         verbose=args.verbose, workers=args.workers, atomic=args.atomic)
 
 # Made with Bob
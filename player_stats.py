@@ -0,0 +1,252 @@
+"""
+Player Statistics Module
+Per-player prefix sums of the score histogram, so statistics for any date
+range are a few subtractions per player instead of a rescan of the scores
+"""
+
+import threading
+from contextlib import closing
+from array import array
+from bisect import bisect_left
+import config
+import round_manager
+import score_cache
+import sqlite_store
+from round_results import resolve_competitor_columns
+
+# Scores are 1-6, config.FAILED_SCORE for a failed game (X) and
+# config.DEFAULT_SCORE for a day without a score
+SCORE_VALUES = range(1, config.DEFAULT_SCORE + 1)
+
+# Rolling averages reported, in holes (one hole per day)
+ROLLING_WINDOWS = (7, 30, 90)
+
+# PlayerStats by scores file, with the cache key of the scores they cover
+_stats = {}
+
+_lock = threading.Lock()
+
+
+class PlayerStats:
+    """
+    Precomputed per-player tables over a score store
+
+    For every player and every score value there is a prefix count of the
+    holes with that score, so the score histogram of rows [start, stop) is
+    counts[stop] - counts[start]. Streaks come from the length of the run of
+    played days ending at each row plus a sparse table over those lengths
+    for range maxima. Each table entry depends only on the rows before it,
+    so new holes are appended and a corrected score only recomputes the
+    rows from that hole on.
+    """
+
+    def __init__(self, players):
+        self.players = list(players)
+        self.hole_count = 0
+        self.scores = b''
+        # counts[player][value - 1][row]: holes before row with that score
+        self.counts = [[array('i', [0]) for _ in SCORE_VALUES] for _ in players]
+        # runs[player][0][row]: consecutive played days ending at row;
+        # runs[player][k][row]: the maximum of runs[player][0][row:row + 2**k]
+        self.runs = [[array('i')] for _ in players]
+
+    def extend(self, store):
+        """
+        Bring the tables up to date with a score store
+
+        Only the holes from the first one that differs (usually the first
+        new hole) are processed: the tables are cut back to that hole and
+        extended from there. If the players changed, the tables are rebuilt.
+
+        Returns:
+            PlayerStats: self, or a rebuilt instance
+        """
+        data = bytes(store.scores)
+        width = store.player_count
+        if store.players != self.players:
+            return PlayerStats(store.players).extend(store)
+
+        start = self.first_changed_row(data, width)
+        if start < self.hole_count:
+            self.truncate(start)
+        for player in range(width):
+            column = data[player::width]
+            counts = self.counts[player]
+            totals = [values[-1] for values in counts]
+            runs = self.runs[player][0]
+            run = runs[-1] if runs else 0
+            for row in range(start, store.hole_count):
+                score = min(max(column[row], 1), config.DEFAULT_SCORE)
+                totals[score - 1] += 1
+                for values, total in zip(counts, totals):
+                    values.append(total)
+                run = 0 if score == config.DEFAULT_SCORE else run + 1
+                runs.append(run)
+            self._extend_sparse_table(self.runs[player], start, store.hole_count)
+
+        self.hole_count = store.hole_count
+        self.scores = data
+        return self
+
+    def first_changed_row(self, data, width):
+        """First row whose scores differ from (or are missing in) the scores the tables cover"""
+        rows = min(self.hole_count, len(data) // width) if width else 0
+        old, new = memoryview(self.scores), memoryview(data)
+        if old[:rows * width] == new[:rows * width]:
+            return rows
+        # Prefixes only stop matching once, so the first bad row is a bisection away
+        return bisect_left(range(rows), True,
+                           key=lambda row: old[:(row + 1) * width] != new[:(row + 1) * width])
+
+    def truncate(self, hole_count):
+        """Drop every table entry that depends on rows from hole_count on"""
+        for counts, levels in zip(self.counts, self.runs):
+            for values in counts:
+                del values[hole_count + 1:]
+            for k, level in enumerate(levels):
+                del level[max(0, hole_count - (1 << k) + 1):]
+        self.hole_count = hole_count
+
+    @staticmethod
+    def _extend_sparse_table(levels, old_count, new_count):
+        """Add the range-maximum entries that cover the new rows to every level"""
+        k = 1
+        while (1 << k) <= new_count:
+            if len(levels) == k:
+                levels.append(array('i'))
+            previous, level, half = levels[k - 1], levels[k], 1 << (k - 1)
+            for row in range(len(level), new_count - (1 << k) + 1):
+                level.append(max(previous[row], previous[row + half]))
+            k += 1
+
+    def range_max_run(self, player, start, stop):
+        """Longest run length ending in rows [start, stop) (runs may begin before start)"""
+        if start >= stop:
+            return 0
+        levels = self.runs[player]
+        k = (stop - start).bit_length() - 1
+        return max(levels[k][start], levels[k][stop - (1 << k)])
+
+    def histogram(self, player, start, stop):
+        """Number of holes with each score value (see SCORE_VALUES) in rows [start, stop)"""
+        return [values[stop] - values[start] for values in self.counts[player]]
+
+    def longest_streak(self, player, start, stop):
+        """Most consecutive played days within rows [start, stop)"""
+        if start >= stop:
+            return 0
+        runs = self.runs[player][0]
+        # Rows whose run began before start are at the front of the range
+        # (up to the first missed day); their runs are cut off at start
+        clipped = bisect_left(range(start, stop), True,
+                              key=lambda row: runs[row] <= row - start)
+        return max(clipped, self.range_max_run(player, start + clipped, stop))
+
+    def current_streak(self, player, stop, start=0):
+        """Consecutive played days up to row stop (exclusive), not counting rows before start"""
+        if stop <= start:
+            return 0
+        return min(self.runs[player][0][stop - 1], stop - start)
+
+    def average(self, player, start, stop):
+        """Mean score on played days (X counts as config.FAILED_SCORE) in rows [start, stop), or None"""
+        histogram = self.histogram(player, start, stop)
+        played = sum(histogram[:config.FAILED_SCORE])
+        if not played:
+            return None
+        return sum(value * count for value, count in zip(SCORE_VALUES, histogram[:config.FAILED_SCORE])) / played
+
+    def summary(self, player, start, stop):
+        """
+        Statistics for one player over rows [start, stop)
+
+        Returns:
+            dict: Holes, played and missed days, mean, score distribution,
+                  failure and missed-day rates, streaks and rolling averages
+                  (over the last 7/30/90 holes up to stop)
+        """
+        histogram = self.histogram(player, start, stop)
+        holes = stop - start
+        played = sum(histogram[:config.FAILED_SCORE])
+        missed = histogram[config.DEFAULT_SCORE - 1]
+        failures = histogram[config.FAILED_SCORE - 1]
+        distribution = {str(value): histogram[value - 1] for value in range(1, config.FAILED_SCORE)}
+        distribution['X'] = failures
+
+        return {
+            'holes': holes,
+            'played': played,
+            'missed': missed,
+            'missed_rate': missed / holes if holes else None,
+            'failures': failures,
+            'failure_rate': failures / played if played else None,
+            'mean': self.average(player, start, stop),
+            'distribution': distribution,
+            'streaks': {
+                'longest': self.longest_streak(player, start, stop),
+                'current': self.current_streak(player, stop, start)
+            },
+            'rolling': {str(window): self.average(player, max(0, stop - window), stop)
+                        for window in ROLLING_WINDOWS}
+        }
+
+
+def get_player_stats(path=None):
+    """
+    Get up-to-date statistics tables for a scores file
+
+    The tables are extended with new holes whenever the scores change.
+
+    Args:
+        path: Path to the scores CSV (defaults to config.SPREADSHEET_PATH)
+
+    Returns:
+        tuple: (ScoreStore, PlayerStats)
+    """
+    if path is None:
+        path = config.SPREADSHEET_PATH
+    entry = score_cache.get_scores(path)
+    with _lock:
+        key, stats = _stats.get(path, (None, None))
+        if key != entry['key']:
+            stats = (stats or PlayerStats(entry['store'].players)).extend(entry['store'])
+            _stats[path] = (entry['key'], stats)
+        return entry['store'], stats
+
+def get_player_scores(name, start_date=None, end_date=None):
+    """
+    Get one player's score on every hole, optionally between two dates
+
+    The name is matched as a round competitor is (see
+    round_results.resolve_competitor_columns). With the SQLite backend the
+    scores come from an indexed query on the score tables; otherwise from
+    the player's column of the score store.
+
+    Args:
+        name: Player name
+        start_date: First date (YYMMDD) to include
+        end_date: Last date (YYMMDD) to include
+
+    Returns:
+        tuple: (player name as in the scores, list of dicts with 'date',
+                'hole' and 'score'), or None if the player is not found
+    """
+    store = score_cache.get_scores()['store']
+    column = resolve_competitor_columns([{'name': name}], store)[0]
+    if column is None:
+        return None
+    player = store.players[column]
+
+    if round_manager.use_sqlite():
+        with closing(sqlite_store.connect()) as conn:
+            rows = sqlite_store.get_player_scores(conn, player, start_date, end_date)
+        return player, [{'date': date, 'hole': hole_num, 'score': score}
+                        for date, hole_num, score in rows]
+
+    start = store.find_date_range(start_date)[0] if start_date else 0
+    stop = store.find_date_range('', end_date)[1] if end_date else store.hole_count
+    return player, [{'date': store.date(row), 'hole': store.hole_num(row),
+                     'score': store.score(row, player)}
+                    for row in range(start, stop)]
+
+# Made with Bob
@@ -5,17 +5,86 @@ Handles creation, persistence, and retrieval of competition rounds
 
 import os
 import json
+import fcntl
+import tempfile
+from contextlib import closing, contextmanager
 from datetime import datetime
 from pathlib import Path
 import config
+import sqlite_store
 
 # Directory to store round configurations
 ROUNDS_DIR = "rounds"
 
+# Index of round summaries, kept up to date as rounds are created and updated
+INDEX_FILE = "index.json"
+
+def use_sqlite():
+    """True if rounds are stored in the SQLite database rather than round directories"""
+    return config.STORAGE_BACKEND == 'sqlite'
+
 def ensure_rounds_directory():
     """Create rounds directory if it doesn't exist"""
     Path(ROUNDS_DIR).mkdir(exist_ok=True)
 
+@contextmanager
+def atomic_open(path):
+    """
+    Open a file for writing that is published atomically
+    
+    Content is written to a temporary file in the same directory and renamed
+    over path when the block exits without error, so readers always see
+    either the complete old file or the complete new one.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+@contextmanager
+def file_lock(lock_path):
+    """Hold an exclusive advisory lock on lock_path for the duration of the block"""
+    with open(lock_path, 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def round_lock(round_date_str, create=False):
+    """
+    Lock a round for writing
+    
+    Only writers take the lock: readers rely on files being published with
+    atomic_open and never block. The date is validated and, unless the round
+    is being created, the round must already exist, so a bad request never
+    leaves an empty round directory behind.
+    
+    Args:
+        round_date_str: Date in YYMMDD format
+        create: True when creating the round (its directory is made)
+    
+    Raises:
+        ValueError: If the date is invalid or the round does not exist
+    """
+    parse_round_date(round_date_str)
+    round_dir = get_round_data_path(round_date_str)
+    if create:
+        Path(round_dir).mkdir(parents=True, exist_ok=True)
+    elif get_round_config(round_date_str) is None:
+        raise ValueError(f"Round {round_date_str} not found")
+    else:
+        Path(round_dir).mkdir(exist_ok=True)  # SQLite rounds have no directory of their own
+    return file_lock(os.path.join(round_dir, ".lock"))
+
 def parse_round_date(date_str):
     """
     Parse date in format YYMMDD (e.g., 251205 for Dec 5, 2025)
@@ -26,6 +95,16 @@ def parse_round_date(date_str):
     except ValueError:
         raise ValueError("Date must be in format YYMMDD (e.g., 251205 for Dec 5, 2025)")
 
+def validate_end_date(round_date_str, end_date_str):
+    """
+    Check a round's end date: format YYMMDD and not before the round date
+    
+    Raises:
+        ValueError: If the end date is invalid
+    """
+    if parse_round_date(end_date_str) < parse_round_date(round_date_str):
+        raise ValueError(f"End date {end_date_str} is before the round date {round_date_str}")
+
 def format_round_date(dt):
     """Format datetime as YYMMDD"""
     return dt.strftime("%y%m%d")
@@ -40,7 +119,8 @@ def get_round_data_path(round_date_str):
     ensure_rounds_directory()
     return os.path.join(ROUNDS_DIR, round_date_str)
 
-def create_new_round(round_date_str, competitors=None, teams=None, competitions=None):
+def create_new_round(round_date_str, competitors=None, teams=None, competitions=None,
+                     end_date_str=None):
     """
     Create a new round with specified configuration
     
@@ -49,12 +129,16 @@ def create_new_round(round_date_str, competitors=None, teams=None, competitions=
         competitors: List of dicts with 'name' and 'team' keys (defaults to config.PLAYERS)
         teams: List of team names (defaults to config.TEAMS)
         competitions: List of competition names (defaults to ['skins'])
+        end_date_str: Optional last date of the round in YYMMDD format
+                      (otherwise the round lasts config.HOLES_PER_ROUND holes)
     
     Returns:
         dict: Round configuration
     """
     # Validate date format
     round_date = parse_round_date(round_date_str)
+    if end_date_str:
+        validate_end_date(round_date_str, end_date_str)
     
     # Use defaults if not provided
     if competitors is None:
@@ -64,10 +148,6 @@ def create_new_round(round_date_str, competitors=None, teams=None, competitions=
     if competitions is None:
         competitions = ['skins']
     
-    # Create round directory
-    round_dir = get_round_data_path(round_date_str)
-    Path(round_dir).mkdir(parents=True, exist_ok=True)
-    
     # Create round configuration
     round_config = {
         'round_date': round_date_str,
@@ -77,29 +157,55 @@ def create_new_round(round_date_str, competitors=None, teams=None, competitions=
         'teams': teams,
         'competitions': competitions,
         'created_at': datetime.now().isoformat(),
-        'status': 'active'
+        'status': 'active',
+        'version': 1
     }
+    if end_date_str:
+        round_config['end_date'] = end_date_str
+    
+    if use_sqlite():
+        with closing(sqlite_store.connect()) as conn:
+            sqlite_store.save_round(conn, round_config)
+        return round_config
+    
+    with round_lock(round_date_str, create=True):
+        write_round_files(round_config, f"# Created: {round_config['created_at']}")
+        update_rounds_index(round_config)
+    
+    return round_config
+
+def write_round_files(round_config, history_line):
+    """
+    Publish a round's config.py and config.json
+    
+    Each file is written to a temporary file and renamed into place, so a
+    reader never sees a half-written configuration.
+    
+    Args:
+        round_config: Round configuration to save
+        history_line: Comment line recording when the round was created/updated
+    """
+    round_date_str = round_config['round_date']
+    round_dir = get_round_data_path(round_date_str)
     
     # Save configuration as Python file
     config_path = get_round_config_path(round_date_str)
-    with open(config_path, 'w') as f:
+    with atomic_open(config_path) as f:
         f.write(f"# Round Configuration - Started {round_config['round_date_formatted']}\n")
-        f.write(f"# Created: {round_config['created_at']}\n\n")
+        f.write(f"{history_line}\n\n")
         f.write(f"ROUND_DATE = '{round_date_str}'\n")
         f.write(f"START_DATE = '{round_config['start_date']}'\n")
         f.write(f"STATUS = '{round_config['status']}'\n\n")
-        f.write(f"COMPETITORS = {repr(competitors)}\n\n")
-        f.write(f"TEAMS = {repr(teams)}\n\n")
-        f.write(f"COMPETITIONS = {repr(competitions)}\n\n")
+        f.write(f"COMPETITORS = {repr(round_config['competitors'])}\n\n")
+        f.write(f"TEAMS = {repr(round_config['teams'])}\n\n")
+        f.write(f"COMPETITIONS = {repr(round_config['competitions'])}\n\n")
         f.write(f"# Default score when a player doesn't have an entry\n")
         f.write(f"DEFAULT_SCORE = {config.DEFAULT_SCORE}\n")
     
     # Also save as JSON for easy reading
     json_path = os.path.join(round_dir, "config.json")
-    with open(json_path, 'w') as f:
+    with atomic_open(json_path) as f:
         json.dump(round_config, f, indent=2)
-    
-    return round_config
 
 def get_all_rounds():
     """
@@ -108,6 +214,10 @@ def get_all_rounds():
     Returns:
         list: List of round configurations sorted by date (newest first)
     """
+    if use_sqlite():
+        with closing(sqlite_store.connect()) as conn:
+            return sqlite_store.get_all_rounds(conn)
+    
     ensure_rounds_directory()
     rounds = []
     
@@ -137,58 +247,164 @@ def get_round_config(round_date_str):
     Returns:
         dict: Round configuration or None if not found
     """
+    if use_sqlite():
+        with closing(sqlite_store.connect()) as conn:
+            return sqlite_store.get_round(conn, round_date_str)
+    
     json_path = os.path.join(ROUNDS_DIR, round_date_str, "config.json")
     if os.path.exists(json_path):
         with open(json_path, 'r') as f:
             return json.load(f)
     return None
 
-def get_active_rounds():
-    """Get list of active rounds"""
-    all_rounds = get_all_rounds()
-    return [r for r in all_rounds if r.get('status') == 'active']
+def get_active_rounds(summaries=None):
+    """
+    Get summaries of the active rounds
+    
+    Args:
+        summaries: Round summaries to filter (defaults to the rounds index)
+    """
+    if summaries is None:
+        summaries = get_round_summaries()
+    return [r for r in summaries if r.get('status') == 'active']
 
-def update_round_config(round_date_str, **updates):
+def update_round_config(round_date_str, expected_version=None, **updates):
     """
     Update round configuration
     
+    The read-modify-write happens under the round's writer lock, so two
+    concurrent edits cannot lose each other's changes. Every update bumps
+    the round's version.
+    
     Args:
         round_date_str: Date in YYMMDD format
-        **updates: Fields to update (competitors, teams, competitions, status)
+        expected_version: If given, the version the caller's edit was based
+                          on; the update is rejected if the round has changed
+                          since
+        **updates: Fields to update (competitors, teams, competitions, status,
+                   end_date; an empty end_date removes it)
+    
+    Raises:
+        ValueError: If the round does not exist, has changed since
+                    expected_version or the end date is invalid
     """
-    round_config = get_round_config(round_date_str)
-    if not round_config:
-        raise ValueError(f"Round {round_date_str} not found")
+    with round_lock(round_date_str):
+        round_config = get_round_config(round_date_str)
+        if not round_config:
+            raise ValueError(f"Round {round_date_str} not found")
     
-    # Update fields
-    for key, value in updates.items():
-        if key in ['competitors', 'teams', 'competitions', 'status']:
-            round_config[key] = value
+        current_version = round_config.get('version', 1)
+        if expected_version is not None and expected_version != current_version:
+            raise ValueError(f"Round {round_date_str} was changed by someone else "
+                             f"(now version {current_version}), please reload and try again")
     
-    round_config['updated_at'] = datetime.now().isoformat()
+        if updates.get('end_date'):
+            validate_end_date(round_date_str, updates['end_date'])
     
-    # Save updated configuration
-    round_dir = get_round_data_path(round_date_str)
+        # Update fields
+        for key, value in updates.items():
+            if key == 'end_date' and not value:
+                round_config.pop('end_date', None)
+            elif key in ['competitors', 'teams', 'competitions', 'status', 'end_date']:
+                round_config[key] = value
     
-    # Update Python config file
-    config_path = get_round_config_path(round_date_str)
-    with open(config_path, 'w') as f:
-        f.write(f"# Round Configuration - Started {round_config['round_date_formatted']}\n")
-        f.write(f"# Updated: {round_config['updated_at']}\n\n")
-        f.write(f"ROUND_DATE = '{round_date_str}'\n")
-        f.write(f"START_DATE = '{round_config['start_date']}'\n")
-        f.write(f"STATUS = '{round_config['status']}'\n\n")
-        f.write(f"COMPETITORS = {repr(round_config['competitors'])}\n\n")
-        f.write(f"TEAMS = {repr(round_config['teams'])}\n\n")
-        f.write(f"COMPETITIONS = {repr(round_config['competitions'])}\n\n")
-        f.write(f"# Default score when a player doesn't have an entry\n")
-        f.write(f"DEFAULT_SCORE = {config.DEFAULT_SCORE}\n")
+        round_config['updated_at'] = datetime.now().isoformat()
+        round_config['version'] = current_version + 1
     
-    # Update JSON file
-    json_path = os.path.join(round_dir, "config.json")
-    with open(json_path, 'w') as f:
-        json.dump(round_config, f, indent=2)
+        if use_sqlite():
+            with closing(sqlite_store.connect()) as conn:
+                sqlite_store.save_round(conn, round_config)
+            return round_config
+    
+        write_round_files(round_config, f"# Updated: {round_config['updated_at']}")
+        update_rounds_index(round_config)
     
     return round_config
 
+def get_rounds_index_path():
+    """Get path to the rounds index file"""
+    ensure_rounds_directory()
+    return os.path.join(ROUNDS_DIR, INDEX_FILE)
+
+def summarize_round(round_config):
+    """Build the index summary of a round configuration"""
+    return {
+        'round_date': round_config['round_date'],
+        'round_date_formatted': round_config['round_date_formatted'],
+        'start_date': round_config['start_date'],
+        'status': round_config['status'],
+        'competitor_count': len(round_config['competitors']),
+        'competitions': round_config['competitions']
+    }
+
+def write_rounds_index(summaries):
+    """
+    Write the rounds index atomically
+    
+    The index is written to a temporary file and renamed into place, so
+    readers always see either the old or the new index.
+    """
+    summaries = sorted(summaries, key=lambda x: x['round_date'], reverse=True)
+    with atomic_open(get_rounds_index_path()) as f:
+        json.dump({'rounds': summaries}, f, indent=2)
+
+def index_lock():
+    """Lock the rounds index; every write to it (update or rebuild) holds this lock"""
+    ensure_rounds_directory()
+    return file_lock(os.path.join(ROUNDS_DIR, ".index.lock"))
+
+def rebuild_rounds_index():
+    """
+    Rebuild the rounds index from the round directories
+    
+    The caller must hold index_lock(), so the rebuild cannot overwrite an
+    update made while the round directories were being read.
+    
+    Returns:
+        list: Round summaries sorted by date (newest first)
+    """
+    summaries = [summarize_round(r) for r in get_all_rounds()]
+    write_rounds_index(summaries)
+    return summaries
+
+def read_rounds_index():
+    """Read the rounds index, or return None if it does not exist yet"""
+    try:
+        with open(get_rounds_index_path(), 'r') as f:
+            return json.load(f)['rounds']
+    except FileNotFoundError:
+        return None
+
+def get_round_summaries():
+    """
+    Get the summary of every round from the rounds index
+    
+    The index is rebuilt from the round directories if it does not exist yet.
+    
+    Returns:
+        list: Round summaries sorted by date (newest first)
+    """
+    if use_sqlite():
+        with closing(sqlite_store.connect()) as conn:
+            return sqlite_store.get_round_summaries(conn)
+    
+    summaries = read_rounds_index()
+    if summaries is None:
+        with index_lock():
+            # Another process may have built it while this one waited
+            summaries = read_rounds_index()
+            if summaries is None:
+                summaries = rebuild_rounds_index()
+    return summaries
+
+def update_rounds_index(round_config):
+    """Add or replace a round's summary in the rounds index"""
+    with index_lock():
+        summaries = read_rounds_index()
+        if summaries is None:
+            summaries = rebuild_rounds_index()
+        summaries = [r for r in summaries if r['round_date'] != round_config['round_date']]
+        summaries.append(summarize_round(round_config))
+        write_rounds_index(summaries)
+
 # Made with Bob
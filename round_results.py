@@ -0,0 +1,347 @@
+"""
+Round Results Module
+Binds rounds to their hole scores and materializes each round's results
+into its round directory
+"""
+
+import os
+import json
+import hashlib
+import functools
+import multiprocessing
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import config
+import competition_engine
+import metrics
+import round_manager
+import score_cache
+import score_store
+import skins_engine
+import sqlite_store
+
+# File holding a round's materialized results, inside the round directory
+RESULTS_FILE = "results.json"
+
+# Version of the results format, part of the source hash so that stored
+# results are regenerated when it changes
+RESULTS_FORMAT = b"2"
+
+
+def resolve_competitor_columns(competitors, store):
+    """
+    Match a round's competitors to player columns in the score store
+
+    Competitors are matched by exact name, then case-insensitively, then by
+    first name (e.g. 'Lorcan' matches 'Lorcan Kavanagh') when that is
+    unambiguous.
+
+    Returns:
+        list: Column index for each competitor, or None if they have no
+              scores (they then get config.DEFAULT_SCORE on every hole)
+    """
+    columns = []
+    for competitor in competitors:
+        name = competitor['name']
+        column = store.player_index.get(name)
+        if column is None:
+            matches = [i for i, player in enumerate(store.players)
+                       if player.lower() == name.lower()]
+            if not matches:
+                matches = [i for i, player in enumerate(store.players)
+                           if player.split()[0].lower() == name.lower()]
+            column = matches[0] if len(matches) == 1 else None
+        columns.append(column)
+    return columns
+
+
+def get_round_rows(round_config, store):
+    """
+    Find the rows of the score store that belong to a round
+
+    A round starts at the first date on or after the round date and runs to
+    its end_date if it has one, otherwise for config.HOLES_PER_ROUND holes.
+
+    Returns:
+        tuple: (start_row, stop_row)
+    """
+    return store.find_date_range(round_config['round_date'], round_config.get('end_date'))
+
+
+def get_rounds_for_dates(dates, store):
+    """
+    Find the rounds that have holes on any of the given dates
+
+    Used to refresh only the rounds affected by new or corrected scores.
+
+    Args:
+        dates: Dates (YYMMDD) whose scores changed
+        store: ScoreStore holding the new scores
+
+    Returns:
+        list: Round configurations
+    """
+    if not dates:
+        return []
+    first, last = min(dates), max(dates)
+    affected = []
+    for summary in round_manager.get_round_summaries():
+        if summary['round_date'] > last:
+            continue
+        round_config = round_manager.get_round_config(summary['round_date'])
+        start, stop = get_round_rows(round_config, store)
+        if stop > start and store.date_key(stop - 1) >= first:
+            affected.append(round_config)
+    return affected
+
+
+def get_round_scores(round_config, store):
+    """
+    Get the scores of every hole in a round, in competitor order
+
+    Returns:
+        tuple: (list of row numbers, list of bytes with one score per competitor)
+    """
+    start, stop = get_round_rows(round_config, store)
+    columns = resolve_competitor_columns(round_config['competitors'], store)
+    rows = list(range(start, stop))
+    holes = []
+    for row in rows:
+        scores = store.row(row)
+        holes.append(bytes(scores[c] if c is not None else config.DEFAULT_SCORE
+                           for c in columns))
+    return rows, holes
+
+
+def get_round_score_table(round_config):
+    """
+    Get every player's score on each hole of a round
+
+    With the SQLite backend this is an indexed query on the score tables;
+    otherwise the round's rows are found by date in the score store.
+
+    Returns:
+        list: One dict per hole with 'date', 'hole' and 'scores' ({player: score})
+    """
+    if round_manager.use_sqlite():
+        with closing(sqlite_store.connect()) as conn:
+            rows = sqlite_store.get_round_scores(conn, round_config['round_date'],
+                                                 round_config.get('end_date'))
+        table = []
+        for date, hole_num, player, score in rows:
+            if not table or table[-1]['date'] != date:
+                table.append({'date': date, 'hole': hole_num, 'scores': {}})
+            table[-1]['scores'][player] = score
+        return table
+
+    store = score_cache.get_scores()['store']
+    start, stop = get_round_rows(round_config, store)
+    return [{'date': store.date(row),
+             'hole': store.hole_num(row),
+             'scores': dict(zip(store.players, store.row(row)))}
+            for row in range(start, stop)]
+
+
+def get_round_source_hash(round_config, holes):
+    """
+    Hash everything a round's results depend on (its config and hole scores)
+
+    The hash is stored in results.json to detect when the results are stale
+    and is used as the round's ETag.
+    """
+    digest = hashlib.sha256(RESULTS_FORMAT)
+    digest.update(json.dumps(round_config, sort_keys=True).encode('utf-8'))
+    for scores in holes:
+        digest.update(b'\0' + scores)
+    return digest.hexdigest()
+
+
+def get_results_path(round_date_str):
+    """Get path to a round's materialized results"""
+    return os.path.join(round_manager.get_round_data_path(round_date_str), RESULTS_FILE)
+
+
+def compute_round_results(round_config, store, rows, holes, source_hash):
+    """
+    Calculate a round's results from its hole scores
+
+    Every competition, skins included, is evaluated in one pass over the
+    holes. Skins continues the round's persisted skins state, so only holes
+    added since it was saved are processed, unless an earlier hole was
+    corrected. The skins standings and hole winners come from that state.
+
+    Returns:
+        dict: Results with skins standings, per-hole winners, the carried pot
+              and the results of each of the round's competitions
+    """
+    round_date = round_config['round_date']
+    players = [competitor['name'] for competitor in round_config['competitors']]
+    teams = {competitor['name']: competitor['team'] for competitor in round_config['competitors']}
+    competition_names = round_config.get('competitions', [])
+
+    state = skins_engine.load_skins_state(round_date)
+    if not skins_engine.state_matches(state, players, holes):
+        state = None
+    previous_holes = state['last_hole'] if state else None
+
+    # Skins always runs, as it drives the round's standings
+    reducers = competition_engine.run_competitions(
+        [competition_engine.Skins.name] + list(competition_names), players,
+        [competitor['team'] for competitor in round_config['competitors']], holes, state)
+    competitions = {name: reducers[name].result() for name in competition_names
+                    if name in reducers}
+
+    state = reducers[competition_engine.Skins.name].state
+    if state['last_hole'] != previous_holes:
+        skins_engine.save_skins_state(round_date, state)
+
+    standings = sorted(({'name': name, 'team': teams[name], 'skins': state['skins'][name]}
+                        for name in players),
+                       key=lambda standing: -standing['skins'])
+
+    hole_results = []
+    for i, row in enumerate(rows):
+        hole_results.append({
+            'hole': i + 1,
+            'date': store.date(row),
+            'scores': dict(zip(players, holes[i])),
+            'winner': state['hole_winners'][i],
+            'points': state['hole_points'][i]
+        })
+
+    return {
+        'round_date': round_date,
+        'source_hash': source_hash,
+        'players': players,
+        'holes_played': len(rows),
+        'standings': standings,
+        'holes': hole_results,
+        'pot_carried': state['pot'],
+        'competitions': competitions
+    }
+
+
+def save_round_results(round_date_str, results):
+    """Write a round's results.json atomically"""
+    results_path = get_results_path(round_date_str)
+    os.makedirs(os.path.dirname(results_path), exist_ok=True)
+    with round_manager.atomic_open(results_path) as f:
+        json.dump(results, f, indent=2)
+
+
+def get_round_etag(round_config, store=None):
+    """Get the ETag for a round's results without loading or computing them"""
+    if store is None:
+        store = score_cache.get_scores()['store']
+    _, holes = get_round_scores(round_config, store)
+    return get_round_source_hash(round_config, holes)
+
+
+def get_round_results(round_config, store=None):
+    """
+    Get a round's results, regenerating results.json only if it is stale
+
+    Args:
+        round_config: Round configuration from round_manager
+        store: ScoreStore (defaults to the cached store for config.SPREADSHEET_PATH)
+
+    Returns:
+        dict: Round results (see compute_round_results)
+    """
+    if store is None:
+        store = score_cache.get_scores()['store']
+    rows, holes = get_round_scores(round_config, store)
+    source_hash = get_round_source_hash(round_config, holes)
+
+    results_path = get_results_path(round_config['round_date'])
+    if os.path.exists(results_path):
+        with open(results_path, 'r') as f:
+            results = json.load(f)
+        if results.get('source_hash') == source_hash:
+            return results
+
+    with metrics.phase('results'):
+        results = compute_round_results(round_config, store, rows, holes, source_hash)
+    save_round_results(round_config['round_date'], results)
+    return results
+
+
+# Score store opened once by each process of a recompute pool
+_worker_store = None
+
+
+def _init_worker(store_path):
+    """Map the score store in a pool process (the pages are shared through the page cache)"""
+    global _worker_store
+    _worker_store = score_store.open_store(store_path)
+
+
+def _recompute_in_process(round_config):
+    return get_round_results(round_config, _worker_store)
+
+
+def recompute_rounds(round_configs=None, mode=None, workers=None):
+    """
+    Bring the results of several rounds up to date in a worker pool
+
+    Every worker reads the same read-only score store: threads share the
+    cached store, and processes each memory-map the store file, so its
+    pages are shared rather than copied. A round that fails does not stop
+    the others.
+
+    Args:
+        round_configs: Rounds to recompute (defaults to every active round)
+        mode: 'thread' or 'process' (defaults to config.RECOMPUTE_MODE)
+        workers: Pool size (defaults to config.RECOMPUTE_WORKERS, or the
+                 executor's default if that is None)
+
+    Returns:
+        dict: 'results' ({round_date: results}) and 'errors'
+              ({round_date: error message})
+    """
+    if round_configs is None:
+        round_configs = [round_manager.get_round_config(r['round_date'])
+                         for r in round_manager.get_active_rounds()]
+    mode = mode or config.RECOMPUTE_MODE
+    workers = workers or config.RECOMPUTE_WORKERS
+    store = score_cache.get_scores()['store']
+
+    if mode == 'process':
+        # Spawned rather than forked, as this may run in a thread of a
+        # multithreaded web worker (see source_watcher)
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                       initargs=(store.path,),
+                                       mp_context=multiprocessing.get_context('spawn'))
+        task = _recompute_in_process
+    elif mode == 'thread':
+        executor = ThreadPoolExecutor(max_workers=workers)
+        task = functools.partial(get_round_results, store=store)
+    else:
+        raise ValueError(f"Unknown recompute mode: {mode}")
+
+    combined = {'results': {}, 'errors': {}}
+    with executor:
+        futures = {round_config['round_date']: executor.submit(task, round_config)
+                   for round_config in round_configs}
+        for round_date, future in futures.items():
+            try:
+                combined['results'][round_date] = future.result()
+            except Exception as e:
+                combined['errors'][round_date] = str(e)
+    return combined
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Recompute the results of all active rounds')
+    parser.add_argument('--mode', choices=['thread', 'process'], help='Worker pool type')
+    parser.add_argument('--workers', type=int, help='Number of workers')
+    args = parser.parse_args()
+
+    combined = recompute_rounds(mode=args.mode, workers=args.workers)
+    for round_date, results in sorted(combined['results'].items()):
+        print(f"{round_date}: {results['holes_played']} holes")
+    for round_date, error in sorted(combined['errors'].items()):
+        print(f"{round_date}: ERROR {error}")
+
+# Made with Bob
@@ -3,13 +3,40 @@ Round Management Routes
 Separate module for handling round-related web routes
 """
 
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, session, make_response, Response, stream_with_context
+import gzip
 import round_manager
+import round_results
+import live_updates
 import config
+import metrics
+import fragment_cache
+import competition_engine
+import win_projection
 
 # Create blueprint
 rounds_bp = Blueprint('rounds', __name__)
 
+def not_modified(etag):
+    """Return a 304 response if the request already has this ETag, else None"""
+    if request.if_none_match.contains(etag):
+        response = make_response('', 304)
+        response.set_etag(etag)
+        return response
+    return None
+
+def compress_response(response):
+    """Gzip a response body if the client accepts it and it is big enough to be worth it"""
+    if response.content_length is None or response.content_length < config.GZIP_MIN_SIZE:
+        return response
+    response.vary.add('Accept-Encoding')
+    # Quality 0 (e.g. 'gzip;q=0') refuses gzip; '*' accepts it
+    if not request.accept_encodings['gzip']:
+        return response
+    response.set_data(gzip.compress(response.get_data(), compresslevel=6))
+    response.headers['Content-Encoding'] = 'gzip'
+    return response
+
 @rounds_bp.route('/start_round', methods=['GET', 'POST'])
 def start_round():
     """Handle starting a new round"""
@@ -17,6 +44,7 @@ def start_round():
         try:
             # Get form data
             round_date = request.form.get('round_date')
+            end_date = request.form.get('end_date', '').strip() or None
             
             # Parse competitors from form
             competitors = []
@@ -31,7 +59,8 @@ def start_round():
                     })
             
             # Get selected competitions
-            competitions = request.form.getlist('competitions[]')
+            competitions = [c for c in request.form.getlist('competitions[]')
+                            if c in competition_engine.COMPETITIONS]
             if not competitions:
                 competitions = ['skins']  # Default
             
@@ -43,7 +72,8 @@ def start_round():
                 round_date,
                 competitors=competitors,
                 teams=teams,
-                competitions=competitions
+                competitions=competitions,
+                end_date_str=end_date
             )
             
             flash(f"Round started successfully for {round_config['round_date_formatted']}!", 'success')
@@ -58,7 +88,7 @@ def start_round():
     # Get default values from config
     default_competitors = config.PLAYERS
     default_teams = config.TEAMS
-    available_competitions = ['skins']  # Will expand in future
+    available_competitions = competition_engine.COMPETITIONS
     
     return render_template('start_round.html',
                          default_competitors=default_competitors,
@@ -68,8 +98,8 @@ def start_round():
 @rounds_bp.route('/rounds')
 def list_rounds():
     """Show all rounds"""
-    rounds = round_manager.get_all_rounds()
-    active_rounds = round_manager.get_active_rounds()
+    rounds = round_manager.get_round_summaries()
+    active_rounds = round_manager.get_active_rounds(rounds)
     
     return render_template('rounds_list.html',
                          rounds=rounds,
@@ -84,8 +114,66 @@ def show_round(round_date):
         flash(f"Round {round_date} not found", 'error')
         return redirect(url_for('rounds.list_rounds'))
     
-    return render_template('show_round.html',
-                         round_config=round_config)
+    # Pages carrying flashed messages are one-off, so only cache the plain page
+    etag = 'html-' + round_results.get_round_etag(round_config)
+    has_messages = '_flashes' in session
+    if not has_messages:
+        cached = not_modified(etag)
+        if cached:
+            return cached
+    
+    results = round_results.get_round_results(round_config)
+    results_html = fragment_cache.render('_round_results.html', results['source_hash'],
+                                         results=results)
+    # The win projection is shown if already computed; otherwise the page
+    # loads it from round_projection so rendering never waits on simulations
+    projection = None
+    projection_pending = False
+    if round_config['status'] == 'active':
+        projection = win_projection.get_cached_projection(round_config, results)
+        projection_pending = (projection is None and
+                              win_projection.get_holes_remaining(round_config, results) > 0)
+    with metrics.phase('render'):
+        response = make_response(render_template('show_round.html',
+                                                 round_config=round_config,
+                                                 results=results,
+                                                 results_html=results_html,
+                                                 projection=projection,
+                                                 projection_pending=projection_pending))
+    if not has_messages:
+        response.set_etag(etag)
+    return response
+
+@rounds_bp.route('/round/<round_date>/projection')
+def round_projection(round_date):
+    """Win probabilities and expected skins from simulated finishes of a round"""
+    round_config = round_manager.get_round_config(round_date)
+    if not round_config:
+        return jsonify({'error': 'Round not found'}), 404
+    
+    simulations = request.args.get('simulations', config.PROJECTION_SIMULATIONS, type=int)
+    if not 1 <= simulations <= config.PROJECTION_MAX_SIMULATIONS:
+        return jsonify({'error': f"simulations must be between 1 and {config.PROJECTION_MAX_SIMULATIONS}"}), 400
+    return jsonify(win_projection.project_round(round_config, simulations,
+                                                request.args.get('seed', type=int)))
+
+@rounds_bp.route('/round/<round_date>/events')
+def round_events(round_date):
+    """Server-Sent Events with new hole results, skins and carried pots for an active round"""
+    round_config = round_manager.get_round_config(round_date)
+    if not round_config:
+        return jsonify({'error': 'Round not found'}), 404
+    
+    # On reconnect the browser sends the id of the last event it received
+    holes_seen, source_hash = live_updates.parse_event_id(request.headers.get('Last-Event-ID'))
+    if holes_seen is None:
+        holes_seen = request.args.get('holes', 0, type=int)
+        source_hash = request.args.get('hash')
+    
+    response = Response(live_updates.get_round_events(round_date, holes_seen, source_hash),
+                        mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 @rounds_bp.route('/round/<round_date>/edit', methods=['GET', 'POST'])
 def edit_round(round_date):
@@ -111,33 +199,49 @@ def edit_round(round_date):
                     })
             
             # Get updated competitions
-            competitions = request.form.getlist('competitions[]')
+            competitions = [c for c in request.form.getlist('competitions[]')
+                            if c in competition_engine.COMPETITIONS]
             if not competitions:
                 competitions = ['skins']
             
             # Get unique teams
             teams = list(set(comp['team'] for comp in competitors))
             
-            # Update the round
+            # The end date is only changed if the form sends one (blank clears it)
+            updates = {}
+            if 'end_date' in request.form:
+                updates['end_date'] = request.form['end_date'].strip() or None
+            
+            # Update the round, rejecting the edit if someone else saved first
+            expected_version = request.form.get('version', type=int)
             round_manager.update_round_config(
                 round_date,
+                expected_version=expected_version,
                 competitors=competitors,
                 teams=teams,
-                competitions=competitions
+                competitions=competitions,
+                **updates
             )
             
             flash("Round updated successfully!", 'success')
             return redirect(url_for('rounds.show_round', round_date=round_date))
             
+        except ValueError as e:
+            # Invalid input: show the form again with the error
+            flash(f"Error updating round: {str(e)}", 'error')
+            status = 400
         except Exception as e:
             flash(f"Error updating round: {str(e)}", 'error')
+            status = 500
+    else:
+        status = 200
     
-    # GET request - show edit form
-    available_competitions = ['skins']
+    # GET request (or a rejected edit) - show edit form
+    available_competitions = competition_engine.COMPETITIONS
     
     return render_template('edit_round.html',
                          round_config=round_config,
-                         available_competitions=available_competitions)
+                         available_competitions=available_competitions), status
 
 @rounds_bp.route('/round/<round_date>/close', methods=['POST'])
 def close_round(round_date):
@@ -152,16 +256,71 @@ def close_round(round_date):
 
 @rounds_bp.route('/api/rounds')
 def api_rounds():
-    """API endpoint to get all rounds as JSON"""
-    rounds = round_manager.get_all_rounds()
-    return jsonify(rounds)
+    """
+    API endpoint to get rounds as JSON, newest first
+    
+    Query parameters (all optional):
+        status: Only rounds with this status (e.g. active)
+        from, to: Only rounds whose date (YYMMDD) is in this range, inclusive
+        limit: Maximum number of rounds to return
+        cursor: Round date to continue after, from a previous page's
+                X-Next-Cursor header
+        fields: Comma-separated fields to include (e.g. round_date,status)
+    """
+    status = request.args.get('status')
+    date_from = request.args.get('from')
+    date_to = request.args.get('to')
+    cursor = request.args.get('cursor')
+    fields = [f for f in request.args.get('fields', '').split(',') if f]
+    limit = request.args.get('limit', type=int)
+    if limit is not None and limit < 1:
+        return jsonify({'error': 'limit must be a positive integer'}), 400
+    
+    # Filter and page on the rounds index, loading full configs only for the
+    # rounds on this page and only if a requested field is not in the index
+    summaries = [r for r in round_manager.get_round_summaries()
+                 if (not status or r['status'] == status) and
+                    (not date_from or r['round_date'] >= date_from) and
+                    (not date_to or r['round_date'] <= date_to) and
+                    (not cursor or r['round_date'] < cursor)]
+    page = summaries[:limit] if limit else summaries
+    
+    if not page or (fields and set(fields) <= set(page[0])):
+        rounds = page
+    else:
+        rounds = [round_manager.get_round_config(r['round_date']) for r in page]
+    if fields:
+        rounds = [{f: r[f] for f in fields if f in r} for r in rounds]
+    
+    response = jsonify(rounds)
+    if limit and len(summaries) > limit:
+        response.headers['X-Next-Cursor'] = page[-1]['round_date']
+    return compress_response(response)
 
 @rounds_bp.route('/api/round/<round_date>')
 def api_round(round_date):
     """API endpoint to get specific round as JSON"""
     round_config = round_manager.get_round_config(round_date)
-    if round_config:
-        return jsonify(round_config)
-    return jsonify({'error': 'Round not found'}), 404
+    if not round_config:
+        return jsonify({'error': 'Round not found'}), 404
+    
+    etag = round_results.get_round_etag(round_config)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    
+    response = jsonify(dict(round_config, results=round_results.get_round_results(round_config)))
+    response.set_etag(etag)
+    return response
+
+@rounds_bp.route('/api/round/<round_date>/scores')
+def api_round_scores(round_date):
+    """API endpoint to get every player's score on each hole of a round"""
+    round_config = round_manager.get_round_config(round_date)
+    if not round_config:
+        return jsonify({'error': 'Round not found'}), 404
+    
+    return compress_response(jsonify({'round_date': round_date,
+                                      'holes': round_results.get_round_score_table(round_config)}))
 
 # Made with Bob
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the parser, score loader, skins engine and round manager
+
+Generates synthetic data (see generate_benchmark_data.py), times each step
+and writes the results as JSON so runs can be compared between versions:
+
+    python run_benchmarks.py --output before.json
+    python run_benchmarks.py --output after.json --compare before.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess
+from datetime import datetime
+import generate_benchmark_data
+import parse_wordle_scores
+import score_store
+import skins_engine
+import round_manager
+import app
+
+
+def time_call(func, repeats, setup=None):
+    """
+    Time a function over several runs
+
+    Args:
+        func: Function to time, called with no arguments
+        repeats: Number of timed runs
+        setup: Optional function called (untimed) before each run
+
+    Returns:
+        dict: min, median and mean time in seconds, and the number of runs
+    """
+    times = []
+    for _ in range(repeats):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {
+        'min_s': min(times),
+        'median_s': statistics.median(times),
+        'mean_s': statistics.mean(times),
+        'repeats': repeats
+    }
+
+
+def get_git_commit():
+    """Current git commit of the working tree, or None outside a checkout"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(data_dir, repeats):
+    """
+    Run every benchmark against the data in data_dir
+
+    Returns:
+        dict: Results by benchmark name (see time_call)
+    """
+    export_path = os.path.join(data_dir, 'whatsapp.txt')
+    csv_path = os.path.join(data_dir, 'scores.csv')
+    store_path = score_store.get_store_path(csv_path)
+    results = {}
+
+    with open(export_path, 'r', encoding='utf-8') as f:
+        lines = f.readlines()
+
+    def parse_lines():
+        for line in lines:
+            parse_wordle_scores.parse_wordle_line(line)
+
+    def clear_date_cache():
+        parse_wordle_scores.format_message_date.cache_clear()
+
+    results['parse_wordle_line'] = time_call(parse_lines, repeats, clear_date_cache)
+    results['parse_export_bulk'] = time_call(
+        lambda: parse_wordle_scores.parse_export_bulk(export_path, workers=1), repeats,
+        clear_date_cache)
+    results['parse_export_bulk_parallel'] = time_call(
+        lambda: parse_wordle_scores.parse_export_bulk(export_path), repeats, clear_date_cache)
+
+    def remove_store():
+        if os.path.exists(store_path):
+            os.remove(store_path)
+
+    results['load_scores_cold'] = time_call(lambda: score_store.load_store(csv_path), repeats,
+                                            remove_store)
+    results['load_scores_warm'] = time_call(lambda: score_store.load_store(csv_path), repeats)
+
+    store = score_store.load_store(csv_path)
+    rounds = score_store.get_rounds(store)
+
+    def calculate_skins():
+        for round_data in rounds:
+            app.calculate_skins(round_data, store.players)
+
+    results['calculate_skins'] = time_call(calculate_skins, repeats)
+    results['calculate_all_skins'] = time_call(
+        lambda: skins_engine.calculate_all_skins(store, rounds), repeats,
+        lambda: store.cache.clear())
+
+    rounds_dir = round_manager.ROUNDS_DIR
+    round_manager.ROUNDS_DIR = os.path.join(data_dir, 'rounds')
+    try:
+        results['get_all_rounds'] = time_call(round_manager.get_all_rounds, repeats)
+        results['get_round_summaries'] = time_call(round_manager.get_round_summaries, repeats)
+    finally:
+        round_manager.ROUNDS_DIR = rounds_dir
+
+    return results
+
+
+def compare_results(results, baseline):
+    """Print the change in median time of each benchmark against a baseline run"""
+    print(f"{'benchmark':<28} {'baseline':>10} {'current':>10} {'change':>8}", file=sys.stderr)
+    for name, result in results.items():
+        before = baseline['results'].get(name)
+        if before is None:
+            continue
+        change = (result['median_s'] - before['median_s']) / before['median_s'] * 100
+        print(f"{name:<28} {before['median_s']:>10.4f} {result['median_s']:>10.4f} "
+              f"{change:>+7.1f}%", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the Wordle competitions benchmarks')
+    parser.add_argument('--lines', type=int, default=1000000, help='Chat lines in the export')
+    parser.add_argument('--players', type=int, default=500, help='Number of players')
+    parser.add_argument('--holes', type=int, default=5000, help='Score rows in the CSV')
+    parser.add_argument('--rounds', type=int, default=200, help='Number of round directories')
+    parser.add_argument('--repeats', type=int, default=5, help='Timed runs per benchmark')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--data-dir', help='Reuse or keep generated data in this directory')
+    parser.add_argument('--output', help='Write JSON results to this file (default: stdout)')
+    parser.add_argument('--compare', help='Baseline JSON results to compare against')
+    args = parser.parse_args()
+
+    params = {'lines': args.lines, 'players': args.players, 'holes': args.holes,
+              'rounds': args.rounds, 'repeats': args.repeats, 'seed': args.seed}
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix='wordle-bench-')
+    try:
+        if not os.path.exists(os.path.join(data_dir, 'scores.csv')):
+            print(f"Generating data in {data_dir}...", file=sys.stderr)
+            os.makedirs(data_dir, exist_ok=True)
+            generate_benchmark_data.generate_whatsapp_export(
+                os.path.join(data_dir, 'whatsapp.txt'), args.lines, args.players, args.seed)
+            generate_benchmark_data.generate_scores_csv(
+                os.path.join(data_dir, 'scores.csv'), args.holes, args.players, args.seed)
+            generate_benchmark_data.generate_rounds(
+                os.path.join(data_dir, 'rounds'), args.rounds, args.players)
+        results = run_benchmarks(data_dir, args.repeats)
+    finally:
+        if not args.data_dir:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    report = {
+        'timestamp': datetime.now().isoformat(),
+        'commit': get_git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'params': params,
+        'results': results
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            compare_results(results, json.load(f))
+
+# Made with Bob
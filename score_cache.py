@@ -0,0 +1,158 @@
+"""
+Score Cache Module
+In-memory cache of parsed rounds and computed results, keyed on the
+source scores file
+"""
+
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+import config
+import metrics
+import score_store
+import skins_engine
+
+# Cached entries by source key, least recently used first
+_entries = OrderedDict()
+
+# Last seen (mtime_ns, size) and content hash for each source path, so the
+# file only has to be hashed again when its stat changes
+_fingerprints = {}
+
+# Paths kept fresh by source_watcher: their cached key is trusted without a
+# stat until the watcher invalidates it
+_watched = set()
+
+_lock = threading.Lock()
+
+# Hit/miss counters for monitoring
+stats = {'hits': 0, 'misses': 0}
+metrics.register_cache('scores', stats)
+
+
+def get_source_key(path):
+    """
+    Get the cache key for a scores file
+
+    The key is the path plus a hash of the file contents. The contents are
+    only re-hashed when the file's mtime or size changes, so an unchanged
+    file costs a single stat per lookup, or none if the file is watched.
+    """
+    known = _fingerprints.get(path)
+    if known and path in _watched:
+        return (path, known[1])
+
+    st = os.stat(path)
+    file_stat = (st.st_mtime_ns, st.st_size)
+    if known and known[0] == file_stat:
+        return (path, known[1])
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    content_hash = digest.hexdigest()
+    _fingerprints[path] = (file_stat, content_hash)
+    return (path, content_hash)
+
+
+def get_scores(path=None):
+    """
+    Get the parsed scores for a scores file, loading them on a cache miss
+
+    Args:
+        path: Path to the scores CSV (defaults to config.SPREADSHEET_PATH)
+
+    Returns:
+        dict: Cache entry with 'key', 'store', 'rounds' and 'players'; other
+              results derived from the scores are added to it by callers
+    """
+    if path is None:
+        path = config.SPREADSHEET_PATH
+
+    with _lock:
+        key = get_source_key(path)
+        entry = _entries.get(key)
+        if entry is not None:
+            _entries.move_to_end(key)
+            stats['hits'] += 1
+            return entry
+
+        stats['misses'] += 1
+        with metrics.phase('load'):
+            store = score_store.load_store(path)
+            entry = {
+                'key': key,
+                'store': store,
+                'rounds': score_store.get_rounds(store),
+                'players': store.players
+            }
+        _entries[key] = entry
+
+        # Evict the least recently used entries beyond the size limit
+        while len(_entries) > config.SCORE_CACHE_SIZE:
+            _entries.popitem(last=False)
+        return entry
+
+
+def get_skins_results(path=None):
+    """
+    Get the parsed scores plus skins results for every round
+
+    Returns:
+        dict: Cache entry from get_scores with 'skins' (one result per round
+              from skins_engine.calculate_all_skins)
+    """
+    entry = get_scores(path)
+    if 'skins' not in entry:
+        with metrics.phase('skins'):
+            entry['skins'] = skins_engine.calculate_all_skins(entry['store'], entry['rounds'])
+    return entry
+
+
+def preload(path=None):
+    """
+    Load the scores and skins results before the web workers start
+
+    Called in the gunicorn master when preloading (see gunicorn.conf.py):
+    workers forked afterwards share the cached entry copy-on-write and the
+    mapped store pages, instead of each parsing the scores on its first
+    request.
+    """
+    return get_skins_results(path)
+
+
+def watch(path):
+    """
+    Stop checking a scores file on every lookup
+
+    The caller (source_watcher) promises to call invalidate(path) whenever
+    the file changes.
+    """
+    _watched.add(path)
+
+
+def get_cached_store(path=None):
+    """Get the most recently used cached store for a scores file without checking the file, or None"""
+    if path is None:
+        path = config.SPREADSHEET_PATH
+    with _lock:
+        for key in reversed(_entries):
+            if key[0] == path:
+                return _entries[key]['store']
+    return None
+
+
+def invalidate(path=None):
+    """Drop cached entries for one scores file, or all entries if no path is given"""
+    with _lock:
+        for key in list(_entries):
+            if path is None or key[0] == path:
+                del _entries[key]
+        if path is None:
+            _fingerprints.clear()
+        else:
+            _fingerprints.pop(path, None)
+
+# Made with Bob
@@ -0,0 +1,330 @@
+"""
+Score Store Module
+Compact columnar storage of hole scores (holes x players) backed by a
+memory-mapped binary file
+"""
+
+import os
+import csv
+import json
+import mmap
+import struct
+import tempfile
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+import config
+import metrics
+import round_manager
+
+# Binary file layout:
+#   MAGIC | uint32 header length | JSON header | dates | hole numbers | scores
+# Dates are fixed-width ASCII, hole numbers one byte per hole and scores one
+# byte per player per hole, stored row by row (hole-major).
+MAGIC = b'WSCORE1\n'
+HEADER_LENGTH = struct.Struct('<I')
+
+
+class ScoreStore:
+    """
+    Scores for every hole as a holes x players byte matrix
+
+    Scores are kept as one unsigned byte each (Wordle scores are 1-8), so a
+    hole's scores are a single bytes object and no per-hole objects are
+    created unless a caller asks for them.
+    """
+
+    def __init__(self, players, teams, dates, holes, scores, date_width, path=None):
+        self.players = players
+        self.teams = teams
+        self.player_count = len(players)
+        self.player_index = {name: i for i, name in enumerate(players)}
+        self.hole_count = len(holes)
+        self.date_width = date_width
+        self.path = path
+        self._dates = dates
+        self._holes = holes
+        self._scores = scores
+        self._date_index = None
+        # Values derived from the scores (e.g. hole winners), computed once
+        # per store by the engines that use them
+        self.cache = {}
+
+    @property
+    def date_index(self):
+        """Dictionary of {date: row}, built on first use"""
+        if self._date_index is None:
+            self._date_index = {self.date(row): row for row in range(self.hole_count)}
+        return self._date_index
+
+    @property
+    def scores(self):
+        """The raw score matrix as a flat bytes-like buffer"""
+        return self._scores
+
+    def date(self, row):
+        """Date string of a row"""
+        start = row * self.date_width
+        return bytes(self._dates[start:start + self.date_width]).rstrip(b' ').decode('ascii')
+
+    def date_key(self, row):
+        """Sortable YYMMDD key of a row's date"""
+        date_str = self.date(row)
+        if len(date_str) == 6 and date_str.isdigit():
+            return date_str
+        date_obj = parse_score_date(date_str)
+        return date_obj.strftime('%y%m%d') if date_obj else date_str
+
+    def find_date_range(self, start_date, end_date=None, hole_count=None):
+        """
+        Find the rows covering a date range by binary search over the dates
+
+        Rows are in date order (the parser writes them sorted), so the range
+        is found in O(log holes) without reading the rest of the history.
+
+        Args:
+            start_date: First date (YYMMDD) of the range
+            end_date: Last date (YYMMDD) of the range, inclusive
+            hole_count: If no end date is given, the number of holes from the
+                        start date (defaults to config.HOLES_PER_ROUND)
+
+        Returns:
+            tuple: (start_row, stop_row)
+        """
+        rows = range(self.hole_count)
+        start = bisect_left(rows, start_date, key=self.date_key)
+        if end_date:
+            stop = bisect_right(rows, end_date, lo=start, key=self.date_key)
+        else:
+            stop = min(start + (hole_count or config.HOLES_PER_ROUND), self.hole_count)
+        return start, stop
+
+    def hole_num(self, row):
+        """Hole number of a row"""
+        return self._holes[row]
+
+    def row(self, row):
+        """Scores of a row as bytes, in player order"""
+        start = row * self.player_count
+        return bytes(self._scores[start:start + self.player_count])
+
+    def score(self, row, player):
+        """Score of a single player on a row"""
+        return self._scores[row * self.player_count + self.player_index[player]]
+
+    def round_ranges(self):
+        """
+        Find the rounds in the store
+
+        A new round starts at every hole 1; rows before the first hole 1 do
+        not belong to any round.
+
+        Returns:
+            list: (start_row, stop_row) pairs, one per round
+        """
+        holes = bytes(self._holes)
+        starts = []
+        position = holes.find(b'\x01')
+        while position != -1:
+            starts.append(position)
+            position = holes.find(b'\x01', position + 1)
+        return list(zip(starts, starts[1:] + [self.hole_count]))
+
+
+def parse_score_date(date_str):
+    """
+    Convert a score date to a datetime object
+
+    Dates are normally YYMMDD (as written by parse_wordle_scores.py); the
+    older 'May-15' format of the sandbox sheet is read as 2024.
+    """
+    for date_format, suffix in (("%y%m%d", ""), ("%b-%d-%Y", "-2024")):
+        try:
+            return datetime.strptime(date_str + suffix, date_format)
+        except ValueError:
+            continue
+    return None
+
+
+def get_store_path(csv_path):
+    """Get path to the binary score store kept next to a scores CSV"""
+    return os.path.splitext(csv_path)[0] + '.scores'
+
+
+def build_store_from_csv(csv_path):
+    """
+    Parse a scores CSV into an in-memory ScoreStore
+
+    Row 1 holds team names, row 2 the player names and rows 3+ the date,
+    hole number and scores. Blank scores become config.DEFAULT_SCORE.
+    """
+    dates = []
+    holes = bytearray()
+    scores = bytearray()
+
+    with open(csv_path, 'r', newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        team_row = next(reader, [])
+        header_row = next(reader, [])
+        players = [name.strip() for name in header_row[2:]]
+        teams = [team.strip() for team in team_row[2:2 + len(players)]]
+        blank_row = [''] * len(players)
+
+        for row in reader:
+            if not row or not row[0]:  # Skip empty rows
+                continue
+            dates.append(row[0].strip())
+            holes.append(int(row[1].strip()))
+            for score in (row[2:] + blank_row)[:len(players)]:
+                score = score.strip()
+                scores.append(int(score) if score else config.DEFAULT_SCORE)
+
+    date_width = max((len(date) for date in dates), default=1)
+    packed_dates = b''.join(date.encode('ascii').ljust(date_width) for date in dates)
+    return ScoreStore(players, teams, packed_dates, bytes(holes), bytes(scores), date_width)
+
+
+def save_store(store, path, source_stat=None):
+    """
+    Write a ScoreStore to its binary file
+
+    The file is written to a temporary path and renamed into place, so
+    processes that already have the old file mapped keep a consistent view.
+
+    Args:
+        store: ScoreStore to save
+        path: Destination path
+        source_stat: os.stat_result of the CSV the store was built from,
+                     used to detect when the binary file is stale
+    """
+    header = {
+        'players': store.players,
+        'teams': store.teams,
+        'hole_count': store.hole_count,
+        'date_width': store.date_width,
+        'source_size': source_stat.st_size if source_stat else None,
+        'source_mtime_ns': source_stat.st_mtime_ns if source_stat else None,
+    }
+    header_bytes = json.dumps(header).encode('utf-8')
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                    prefix='.scores-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(MAGIC)
+            f.write(HEADER_LENGTH.pack(len(header_bytes)))
+            f.write(header_bytes)
+            f.write(store._dates)
+            f.write(store._holes)
+            f.write(store._scores)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def read_store_header(data):
+    """Read the JSON header of a mapped store file, returning (header, data offset)"""
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError("Not a score store file")
+    offset = len(MAGIC) + HEADER_LENGTH.size
+    (header_length,) = HEADER_LENGTH.unpack(data[len(MAGIC):offset])
+    header = json.loads(data[offset:offset + header_length])
+    return header, offset + header_length
+
+
+def open_store(path):
+    """
+    Open a binary score store by memory-mapping it
+
+    Nothing is parsed beyond the small JSON header; dates, hole numbers and
+    scores are read straight from the mapping (shared between processes
+    through the page cache).
+    """
+    with open(path, 'rb') as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    header, offset = read_store_header(data)
+    hole_count = header['hole_count']
+    date_width = header['date_width']
+    view = memoryview(data)
+
+    dates_end = offset + hole_count * date_width
+    holes_end = dates_end + hole_count
+    scores_end = holes_end + hole_count * len(header['players'])
+
+    store = ScoreStore(header['players'], header['teams'],
+                       view[offset:dates_end], view[dates_end:holes_end],
+                       view[holes_end:scores_end], date_width, path=path)
+    store.header = header
+    return store
+
+
+def open_current_store(store_path, source_stat):
+    """Open the store file if it was built from the CSV with this stat, else return None"""
+    if not os.path.exists(store_path):
+        return None
+    store = open_store(store_path)
+    if (store.header['source_size'] == source_stat.st_size and
+            store.header['source_mtime_ns'] == source_stat.st_mtime_ns):
+        return store
+    return None
+
+
+def load_store(csv_path=None):
+    """
+    Load the score store for a scores CSV
+
+    The binary file next to the CSV is memory-mapped if it is up to date,
+    otherwise a new generation is built from the CSV and published. The
+    rebuild happens under a lock, so when several processes (e.g. gunicorn
+    workers) notice the change at once only one of them parses the CSV and
+    the others map the file it wrote.
+
+    Args:
+        csv_path: Path to the scores CSV (defaults to config.SPREADSHEET_PATH)
+
+    Returns:
+        ScoreStore
+    """
+    if csv_path is None:
+        csv_path = config.SPREADSHEET_PATH
+    store_path = get_store_path(csv_path)
+    source_stat = os.stat(csv_path)
+
+    store = open_current_store(store_path, source_stat)
+    if store is not None:
+        return store
+
+    with round_manager.file_lock(store_path + '.lock'):
+        store = open_current_store(store_path, source_stat)
+        if store is not None:
+            return store
+        with metrics.phase('parse'):
+            store = build_store_from_csv(csv_path)
+        save_store(store, store_path, source_stat)
+    return open_store(store_path)
+
+
+def get_rounds(store):
+    """
+    Organize the store's holes into rounds
+
+    Returns:
+        list: Round dicts with the store, row range, start/end dates and
+              number of holes
+    """
+    rounds = []
+    for start, stop in store.round_ranges():
+        rounds.append({
+            'store': store,
+            'start': start,
+            'stop': stop,
+            'start_date': store.date(start),
+            'end_date': store.date(stop - 1),
+            'total_holes': stop - start
+        })
+    return rounds
+
+# Made with Bob
@@ -0,0 +1,260 @@
+"""
+Skins Engine Module
+Batch skins calculation over the whole holes x players score matrix
+"""
+
+import os
+import sys
+import json
+import operator
+from array import array
+from itertools import repeat
+import round_manager
+
+# File holding a round's incremental skins state, inside the round directory
+SKINS_STATE_FILE = "skins_state.json"
+
+# Most players for which find_hole_winners packs holes into integer lanes.
+# Each player costs a few big-integer operations over every hole, so beyond
+# this the per-row loop is faster.
+LANE_MAX_PLAYERS = 32
+
+
+def find_hole_winners(store):
+    """
+    Find the skin winner of every hole in the store in one pass
+
+    A hole is won when exactly one player has the lowest score. The result
+    depends only on the scores, so it is computed once per store and shared
+    by every round.
+
+    With up to LANE_MAX_PLAYERS players the holes are searched as lanes of
+    large integers (see find_winners_by_lane); with more, the per-lane work
+    grows with the player count and a loop over the rows is faster.
+
+    Args:
+        store: ScoreStore
+
+    Returns:
+        array: Column index of the winning player for each row, -1 on a tie
+    """
+    winners = store.cache.get('hole_winners')
+    if winners is not None:
+        return winners
+
+    data = bytes(store.scores)
+    width = store.player_count
+    if not width:
+        winners = array('i', [-1]) * store.hole_count
+    elif width <= LANE_MAX_PLAYERS:
+        winners = find_winners_by_lane(data, width, store.hole_count)
+    else:
+        winners = find_winners_by_row(data, width, store.hole_count)
+
+    store.cache['hole_winners'] = winners
+    return winners
+
+
+def find_winners_by_row(data, width, rows):
+    """Winning column of each row of a holes x players score matrix, one row at a time"""
+    winners = array('i', [-1]) * rows
+    for row in range(rows):
+        scores = data[row * width:(row + 1) * width]
+        min_score = min(scores)
+        if scores.count(min_score) == 1:
+            winners[row] = scores.index(min_score)
+    return winners
+
+
+def find_winners_by_lane(data, width, rows):
+    """
+    Winning column of each row of a holes x players score matrix, with
+    every row a byte lane inside one large integer per player
+
+    The search is a few integer operations per player and score value,
+    working through the values from lowest to highest, instead of a loop
+    over the rows. Lanes hold the winner's column + 1, so width must be
+    below 255.
+    """
+    columns = [data[player::width] for player in range(width)]
+    won = [0] * width
+    decided = 0  # Rows whose lowest score has already been seen
+    for score in sorted(set(data)):
+        table = bytes(int(value == score) for value in range(256))
+        at_score = [int.from_bytes(column.translate(table), sys.byteorder) for column in columns]
+        # Rows where at least one / more than one player has this score
+        once = twice = 0
+        for lanes in at_score:
+            twice |= once & lanes
+            once |= lanes
+        sole = once & ~twice & ~decided
+        if sole:
+            for player, lanes in enumerate(at_score):
+                won[player] |= lanes & sole
+        decided |= once
+
+    # Each row holds its winner's column + 1, or 0 on a tie
+    positions = sum((player + 1) * lanes for player, lanes in enumerate(won))
+    return array('i', map(operator.sub, positions.to_bytes(rows, sys.byteorder), repeat(1)))
+
+
+def calculate_round_skins(winners, start, stop, player_count):
+    """
+    Carry the points pool through one round's holes
+
+    Args:
+        winners: Per-row winners from find_hole_winners
+        start: First row of the round
+        stop: Row after the last row of the round
+        player_count: Number of players in the store
+
+    Returns:
+        tuple: (skins per player column, points won on each hole, points
+                still in the pool at the end of the round)
+    """
+    totals = [0] * player_count
+    hole_points = []
+    points_pool = 0
+    for winner in winners[start:stop]:
+        points_pool += 1
+        if winner >= 0:
+            totals[winner] += points_pool
+            hole_points.append(points_pool)
+            points_pool = 0
+        else:
+            hole_points.append(0)
+    return totals, hole_points, points_pool
+
+
+def iter_round_skins(store, rounds):
+    """
+    Calculate skins round by round, yielding each round's result as soon as
+    it is ready (see calculate_all_skins for the result format)
+    """
+    winners = find_hole_winners(store)
+    players = store.players
+    for round_data in rounds:
+        start, stop = round_data['start'], round_data['stop']
+        totals, hole_points, pot_carried = calculate_round_skins(
+            winners, start, stop, store.player_count)
+        yield {
+            'skins': dict(zip(players, totals)),
+            'hole_winners': [players[w] if w >= 0 else None for w in winners[start:stop]],
+            'hole_points': hole_points,
+            'pot_carried': pot_carried
+        }
+
+
+def calculate_all_skins(store, rounds):
+    """
+    Calculate skins for every round at once
+
+    Gives the same skin totals as app.calculate_skins for each round.
+
+    Args:
+        store: ScoreStore holding the rounds' scores
+        rounds: Round dicts from score_store.get_rounds
+
+    Returns:
+        list: One dict per round with 'skins' ({player: skins}),
+              'hole_winners' (winning player or None for each hole),
+              'hole_points' (points won on each hole) and 'pot_carried'
+              (points left in the pool when the round ended)
+    """
+    return list(iter_round_skins(store, rounds))
+
+
+def new_skins_state(players):
+    """
+    Create an empty incremental skins state for a round
+
+    Args:
+        players: Player names, in the order scores are given to append_hole
+
+    Returns:
+        dict: State with the current pot, per-player skins, the number of
+              holes processed and per-hole scores, winners and points
+    """
+    return {
+        'players': list(players),
+        'pot': 0,
+        'skins': {player: 0 for player in players},
+        'last_hole': 0,
+        'hole_scores': [],
+        'hole_winners': [],
+        'hole_points': []
+    }
+
+
+def append_hole(state, scores):
+    """
+    Add the next hole to a skins state in O(players)
+
+    Args:
+        state: State from new_skins_state
+        scores: The hole's scores in player order (bytes or list of ints)
+
+    Returns:
+        str: Name of the player who won the skin, or None if the pot carries
+    """
+    scores = bytes(scores)
+    state['pot'] += 1
+    state['last_hole'] += 1
+    state['hole_scores'].append(list(scores))
+
+    min_score = min(scores)
+    if scores.count(min_score) == 1:
+        winner = state['players'][scores.index(min_score)]
+        state['skins'][winner] += state['pot']
+        state['hole_points'].append(state['pot'])
+        state['hole_winners'].append(winner)
+        state['pot'] = 0
+        return winner
+
+    state['hole_points'].append(0)
+    state['hole_winners'].append(None)
+    return None
+
+
+def rebuild_skins_state(players, holes):
+    """Replay every hole of a round into a fresh skins state"""
+    state = new_skins_state(players)
+    for scores in holes:
+        append_hole(state, scores)
+    return state
+
+
+def state_matches(state, players, holes):
+    """
+    Check that a skins state covers the first holes of a round as they are now
+
+    False if there is no state, the players changed or a hole the state has
+    already processed was corrected since.
+    """
+    return (state is not None and state['players'] == list(players) and
+            state['last_hole'] <= len(holes) and
+            all(list(holes[i]) == seen for i, seen in enumerate(state['hole_scores'])))
+
+
+def get_skins_state_path(round_date_str):
+    """Get path to a round's persisted skins state"""
+    return os.path.join(round_manager.get_round_data_path(round_date_str), SKINS_STATE_FILE)
+
+
+def load_skins_state(round_date_str):
+    """Load a round's persisted skins state, or None if there is none"""
+    state_path = get_skins_state_path(round_date_str)
+    if os.path.exists(state_path):
+        with open(state_path, 'r') as f:
+            return json.load(f)
+    return None
+
+
+def save_skins_state(round_date_str, state):
+    """Persist a round's skins state in its round directory"""
+    state_path = get_skins_state_path(round_date_str)
+    os.makedirs(os.path.dirname(state_path), exist_ok=True)
+    with round_manager.atomic_open(state_path) as f:
+        json.dump(state, f, indent=2)
+
+# Made with Bob
@@ -0,0 +1,346 @@
+"""
+Source Watcher Module
+Watches sourceData/ and rounds/ and refreshes only what a change affects:
+new export messages are parsed incrementally, changed score files are
+reloaded and the rounds whose scores or configuration changed are
+recomputed
+"""
+
+import os
+import sys
+import time
+import fcntl
+import select
+import struct
+import ctypes
+import ctypes.util
+import threading
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import config
+import parse_wordle_scores
+import round_manager
+import round_results
+import score_cache
+
+# inotify event flags (from <sys/inotify.h>)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+# struct inotify_event header: wd, mask, cookie, len (followed by the name)
+EVENT_HEADER = struct.Struct('iIII')
+
+_thread = None
+
+# (mtime_ns, size) of each export when it was last parsed, so a lost-events
+# rescan only parses exports that really changed
+_export_stats = {}
+
+# Process that parses changed exports. It is spawned rather than forked, as
+# the watcher runs in a thread of a multithreaded web worker. The spawned
+# process has no threads of its own, so the parser's bulk pool can safely
+# fork from it.
+_pool = None
+
+
+def is_watched_dir(name):
+    """Skip hidden and cache directories (e.g. __pycache__)"""
+    return not name.startswith(('.', '__'))
+
+
+class InotifyWatcher:
+    """Directory watcher using Linux inotify through ctypes"""
+
+    def __init__(self, directories):
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.paths = {}
+        for directory in directories:
+            self.add_tree(directory)
+
+    def add_watch(self, directory):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+        self.paths[wd] = directory
+
+    def add_tree(self, directory):
+        """Watch a directory and its subdirectories (e.g. rounds/<date>/)"""
+        os.makedirs(directory, exist_ok=True)
+        self.add_watch(directory)
+        for entry in os.scandir(directory):
+            if is_watched_dir(entry.name) and entry.is_dir():
+                self.add_watch(os.path.normpath(entry.path))
+
+    def wait(self, timeout):
+        """
+        Wait up to timeout seconds for changes
+
+        Returns:
+            set: Paths of the changed files, or None if events were lost
+                 and everything must be treated as changed
+        """
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        changed = set()
+        data = os.read(self.fd, 64 * 1024)
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, name_length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + name_length].rstrip(b'\0').decode('utf-8', 'replace')
+            offset += name_length
+
+            if mask & IN_Q_OVERFLOW:
+                return None
+            if wd not in self.paths:
+                continue
+            path = os.path.join(self.paths[wd], name)
+            if not mask & IN_ISDIR:
+                changed.add(path)
+            elif mask & (IN_CREATE | IN_MOVED_TO) and is_watched_dir(name):
+                # A new round directory: watch it, and pick up files written
+                # before the watch was in place
+                self.add_watch(path)
+                changed.update(os.path.join(path, n) for n in os.listdir(path))
+        return changed
+
+
+class PollingWatcher:
+    """Directory watcher that compares file stats every config.WATCH_POLL_SECONDS"""
+
+    def __init__(self, directories):
+        self.directories = directories
+        self.stats = self.scan()
+
+    def scan(self):
+        stats = {}
+        for directory in self.directories:
+            for root, dirs, files in os.walk(directory):
+                dirs[:] = [d for d in dirs if is_watched_dir(d)]
+                for name in files:
+                    path = os.path.normpath(os.path.join(root, name))
+                    try:
+                        st = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    stats[path] = (st.st_mtime_ns, st.st_size)
+        return stats
+
+    def wait(self, timeout):
+        """Wait up to timeout seconds (None for one poll interval) and return the changed paths"""
+        time.sleep(config.WATCH_POLL_SECONDS if timeout is None
+                   else min(timeout, config.WATCH_POLL_SECONDS))
+        stats = self.scan()
+        changed = {path for path in stats.keys() | self.stats.keys()
+                   if stats.get(path) != self.stats.get(path)}
+        self.stats = stats
+        return changed
+
+
+@contextmanager
+def try_lock(lock_path):
+    """
+    Take an exclusive lock without waiting
+
+    Yields True if this process holds the lock, False if another process
+    (e.g. another gunicorn worker's watcher) is already doing the work.
+    """
+    with open(lock_path, 'a') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def get_changed_dates(old_store, new_store):
+    """
+    Find the dates whose scores differ between two versions of a score store
+
+    Returns:
+        list: Dates (YYMMDD) that are new or whose scores changed, or every
+              date in the new store if the players changed
+    """
+    if old_store is None or old_store.players != new_store.players:
+        return [new_store.date_key(row) for row in range(new_store.hole_count)]
+    old_rows = old_store.date_index
+    changed = []
+    for row in range(new_store.hole_count):
+        old_row = old_rows.get(new_store.date(row))
+        if old_row is None or old_store.row(old_row) != new_store.row(row):
+            changed.append(new_store.date_key(row))
+    return changed
+
+
+def refresh_scores(csv_path):
+    """Reload a changed scores file and recompute the rounds with changed holes"""
+    old_store = score_cache.get_cached_store(csv_path)
+    score_cache.invalidate(csv_path)
+    if not os.path.exists(csv_path):
+        return
+    new_store = score_cache.get_scores(csv_path)['store']
+    if os.path.normpath(csv_path) != os.path.normpath(config.SPREADSHEET_PATH):
+        return
+
+    dates = get_changed_dates(old_store, new_store)
+    if not dates:
+        return
+    with try_lock(csv_path + '.refresh.lock') as locked:
+        if locked:
+            rounds = round_results.get_rounds_for_dates(dates, new_store)
+            round_results.recompute_rounds(rounds)
+            print(f"Scores changed on {len(dates)} date(s), "
+                  f"recomputed {len(rounds)} round(s)")
+
+
+def refresh_rounds(round_dates):
+    """Rebuild the rounds index and recompute rounds whose config.json changed"""
+    if round_manager.use_sqlite():
+        return
+    with try_lock(os.path.join(round_manager.ROUNDS_DIR, '.refresh.lock')) as locked:
+        if not locked:
+            return
+        with round_manager.index_lock():
+            round_manager.rebuild_rounds_index()
+        rounds = [round_config for round_config in map(round_manager.get_round_config, round_dates)
+                  if round_config]
+        round_results.recompute_rounds(rounds)
+        print(f"Round configuration changed, recomputed {len(rounds)} round(s)")
+
+
+def get_export_stat(export_path):
+    """(mtime_ns, size) of an export, or None if it does not exist"""
+    try:
+        st = os.stat(export_path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def parse_export(export_path, csv_path):
+    """
+    Parse new messages of an export into its scores CSV, in the watcher's
+    parse process
+
+    The CSV is only ever appended to or merged into (see
+    parse_wordle_scores.merge_export), never rebuilt from the export alone.
+    """
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'))
+    stat = get_export_stat(export_path)
+    try:
+        _pool.submit(parse_wordle_scores.merge_export, export_path, csv_path).result()
+    except BrokenProcessPool:
+        _pool = None  # Start a new process for the next change
+        raise
+    _export_stats[export_path] = stat
+
+
+def handle_changes(paths):
+    """
+    Refresh everything affected by a batch of changed files
+
+    Args:
+        paths: Changed file paths, or None if unknown (refresh everything)
+    """
+    exports = {os.path.normpath(path): csv_path for path, csv_path in config.SOURCE_EXPORTS.items()}
+    rounds_dir = os.path.normpath(round_manager.ROUNDS_DIR)
+    if paths is None:
+        paths = {path for path in exports if get_export_stat(path) != _export_stats.get(path)}
+        paths.add(os.path.normpath(config.SPREADSHEET_PATH))
+        paths |= {os.path.join(rounds_dir, date, 'config.json')
+                  for date in os.listdir(rounds_dir)}
+
+    csv_paths = {path for path in paths if path.endswith('.csv')}
+    round_dates = {os.path.basename(os.path.dirname(path)) for path in paths
+                   if os.path.basename(path) == 'config.json' and
+                   os.path.dirname(os.path.dirname(path)) == rounds_dir}
+
+    for path in paths & exports.keys():
+        with try_lock(path + '.lock') as locked:
+            if locked and os.path.exists(path):
+                print(f"Export {path} changed, parsing new messages")
+                parse_export(path, exports[path])
+        csv_paths.add(os.path.normpath(exports[path]))
+
+    for csv_path in csv_paths:
+        refresh_scores(csv_path)
+    if round_dates:
+        refresh_rounds(sorted(round_dates))
+
+
+def watch(directories=None):
+    """
+    Watch for changes forever, handling them in debounced batches
+
+    Changes are collected until nothing has changed for
+    config.WATCH_DEBOUNCE_SECONDS, so a file written in several steps (or a
+    burst of files) is handled once.
+    """
+    directories = directories or config.WATCH_DIRS
+    try:
+        watcher = InotifyWatcher(directories)
+    except (OSError, AttributeError):
+        # No inotify (not Linux, or out of watches)
+        watcher = PollingWatcher(directories)
+
+    # Exports as they are now; later changes are parsed as they happen
+    for path in config.SOURCE_EXPORTS:
+        _export_stats[os.path.normpath(path)] = get_export_stat(os.path.normpath(path))
+
+    # Score files are now refreshed when they change, so lookups stop
+    # checking them on every request
+    for directory in directories:
+        for name in os.listdir(directory):
+            if name.endswith('.csv'):
+                score_cache.watch(os.path.join(directory, name))
+
+    while True:
+        changed = watcher.wait(None)
+        if changed is not None and not changed:
+            continue
+        while True:
+            more = watcher.wait(config.WATCH_DEBOUNCE_SECONDS)
+            if more is None:
+                changed = None
+            elif not more:
+                break
+            elif changed is not None:
+                changed |= more
+        try:
+            handle_changes(changed)
+        except Exception as e:
+            print(f"Error handling source changes: {e}", file=sys.stderr)
+
+
+def start():
+    """Start the watcher in a background thread (once per process)"""
+    global _thread
+    if _thread is None or not _thread.is_alive():
+        _thread = threading.Thread(target=watch, name='source-watcher', daemon=True)
+        _thread.start()
+    return _thread
+
+
+if __name__ == '__main__':
+    watch()
+
+# Made with Bob
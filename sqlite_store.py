@@ -0,0 +1,348 @@
+"""
+SQLite Storage Module
+Optional embedded database backend for rounds and scores
+"""
+
+import os
+import csv
+import json
+import sqlite3
+import config
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rounds (
+    round_date TEXT PRIMARY KEY,
+    round_date_formatted TEXT NOT NULL,
+    start_date TEXT NOT NULL,
+    end_date TEXT,
+    status TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 1,
+    teams TEXT NOT NULL,
+    competitions TEXT NOT NULL,
+    created_at TEXT,
+    updated_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS competitors (
+    round_date TEXT NOT NULL REFERENCES rounds (round_date) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    team TEXT NOT NULL,
+    PRIMARY KEY (round_date, position)
+);
+
+CREATE TABLE IF NOT EXISTS holes (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    date TEXT NOT NULL,
+    hole_num INTEGER NOT NULL,
+    UNIQUE (source, date)
+);
+
+CREATE TABLE IF NOT EXISTS scores (
+    hole_id INTEGER NOT NULL REFERENCES holes (id) ON DELETE CASCADE,
+    player TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    PRIMARY KEY (hole_id, player)
+);
+
+CREATE INDEX IF NOT EXISTS idx_rounds_status ON rounds (status, round_date);
+CREATE INDEX IF NOT EXISTS idx_competitors_name ON competitors (name);
+CREATE INDEX IF NOT EXISTS idx_holes_date ON holes (date);
+CREATE INDEX IF NOT EXISTS idx_scores_player ON scores (player, hole_id);
+"""
+
+
+def connect(db_path=None):
+    """
+    Open the SQLite database, creating the schema if needed
+
+    Args:
+        db_path: Path to the database file (defaults to config.SQLITE_PATH)
+
+    Returns:
+        sqlite3.Connection with rows accessible by column name
+    """
+    conn = sqlite3.connect(db_path or config.SQLITE_PATH)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def save_round(conn, round_config):
+    """Insert or replace a round configuration and its competitors"""
+    with conn:
+        conn.execute(
+            """INSERT OR REPLACE INTO rounds
+               (round_date, round_date_formatted, start_date, end_date, status,
+                version, teams, competitions, created_at, updated_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (round_config['round_date'], round_config['round_date_formatted'],
+             round_config['start_date'], round_config.get('end_date'),
+             round_config['status'],
+             round_config.get('version', 1),
+             json.dumps(round_config['teams']), json.dumps(round_config['competitions']),
+             round_config.get('created_at'), round_config.get('updated_at')))
+        conn.execute("DELETE FROM competitors WHERE round_date = ?",
+                     (round_config['round_date'],))
+        conn.executemany(
+            "INSERT INTO competitors (round_date, position, name, team) VALUES (?, ?, ?, ?)",
+            [(round_config['round_date'], i, c['name'], c['team'])
+             for i, c in enumerate(round_config['competitors'])])
+
+
+def _round_from_row(conn, row):
+    """Build a round configuration dict from a rounds table row"""
+    competitors = conn.execute(
+        "SELECT name, team FROM competitors WHERE round_date = ? ORDER BY position",
+        (row['round_date'],)).fetchall()
+    round_config = {
+        'round_date': row['round_date'],
+        'round_date_formatted': row['round_date_formatted'],
+        'start_date': row['start_date'],
+        'competitors': [{'name': c['name'], 'team': c['team']} for c in competitors],
+        'teams': json.loads(row['teams']),
+        'competitions': json.loads(row['competitions']),
+        'created_at': row['created_at'],
+        'status': row['status'],
+        'version': row['version']
+    }
+    if row['end_date']:
+        round_config['end_date'] = row['end_date']
+    if row['updated_at']:
+        round_config['updated_at'] = row['updated_at']
+    return round_config
+
+
+def get_round(conn, round_date_str):
+    """Get a round configuration, or None if it does not exist"""
+    row = conn.execute("SELECT * FROM rounds WHERE round_date = ?",
+                       (round_date_str,)).fetchone()
+    return _round_from_row(conn, row) if row else None
+
+
+def get_all_rounds(conn, status=None):
+    """Get all round configurations (optionally only one status), newest first"""
+    if status is None:
+        rows = conn.execute("SELECT * FROM rounds ORDER BY round_date DESC").fetchall()
+    else:
+        rows = conn.execute("SELECT * FROM rounds WHERE status = ? ORDER BY round_date DESC",
+                            (status,)).fetchall()
+    return [_round_from_row(conn, row) for row in rows]
+
+
+def get_round_summaries(conn):
+    """Get the summary fields of every round, newest first"""
+    rows = conn.execute(
+        """SELECT r.round_date, r.round_date_formatted, r.start_date, r.status,
+                  r.competitions, COUNT(c.name) AS competitor_count
+           FROM rounds r LEFT JOIN competitors c ON c.round_date = r.round_date
+           GROUP BY r.round_date
+           ORDER BY r.round_date DESC""").fetchall()
+    return [{
+        'round_date': row['round_date'],
+        'round_date_formatted': row['round_date_formatted'],
+        'start_date': row['start_date'],
+        'status': row['status'],
+        'competitor_count': row['competitor_count'],
+        'competitions': json.loads(row['competitions'])
+    } for row in rows]
+
+
+def read_score_rows(csv_path, dates=None):
+    """
+    Read the players and score rows of a scores CSV
+
+    Blank scores become config.DEFAULT_SCORE, as in the web app.
+
+    Args:
+        csv_path: Path to the scores CSV
+        dates: Only return the rows for these dates (defaults to every row)
+
+    Returns:
+        tuple: (player names, list of (date, hole_num, scores) rows)
+    """
+    with open(csv_path, 'r', newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader, None)  # Team names
+        header_row = next(reader, [])
+        players = [name.strip() for name in header_row[2:]]
+
+        rows = []
+        for row in reader:
+            if not row or not row[0].strip():
+                continue
+            date = row[0].strip()
+            if dates is not None and date not in dates:
+                continue
+            scores = [int(s.strip()) if s.strip() else config.DEFAULT_SCORE
+                      for s in row[2:2 + len(players)]]
+            scores.extend([config.DEFAULT_SCORE] * (len(players) - len(scores)))
+            rows.append((date, int(row[1].strip()), scores))
+    return players, rows
+
+
+def import_scores_csv(conn, csv_path):
+    """
+    Import a scores CSV, replacing any holes previously imported from it
+
+    Returns:
+        int: Number of holes imported
+    """
+    source = os.path.basename(csv_path)
+    players, rows = read_score_rows(csv_path)
+    with conn:
+        conn.execute("DELETE FROM holes WHERE source = ?", (source,))
+        for date, hole_num, scores in rows:
+            cursor = conn.execute(
+                "INSERT INTO holes (source, date, hole_num) VALUES (?, ?, ?)",
+                (source, date, hole_num))
+            conn.executemany(
+                "INSERT INTO scores (hole_id, player, score) VALUES (?, ?, ?)",
+                [(cursor.lastrowid, player, score) for player, score in zip(players, scores)])
+    return len(rows)
+
+
+def update_scores_csv(conn, csv_path, dates):
+    """
+    Bring the holes of some dates up to date with a scores CSV
+
+    Each date's hole is inserted or updated in place with all of its
+    scores, so only the dates that changed are written.
+
+    Args:
+        conn: Database connection
+        csv_path: Path to the scores CSV
+        dates: Dates (YYMMDD) whose rows were added or changed
+
+    Returns:
+        int: Number of holes written
+    """
+    source = os.path.basename(csv_path)
+    players, rows = read_score_rows(csv_path, set(dates))
+    with conn:
+        for date, hole_num, scores in rows:
+            conn.execute(
+                """INSERT INTO holes (source, date, hole_num) VALUES (?, ?, ?)
+                   ON CONFLICT (source, date) DO UPDATE SET hole_num = excluded.hole_num""",
+                (source, date, hole_num))
+            hole_id = conn.execute("SELECT id FROM holes WHERE source = ? AND date = ?",
+                                   (source, date)).fetchone()['id']
+            conn.execute("DELETE FROM scores WHERE hole_id = ?", (hole_id,))
+            conn.executemany(
+                "INSERT INTO scores (hole_id, player, score) VALUES (?, ?, ?)",
+                [(hole_id, player, score) for player, score in zip(players, scores)])
+    return len(rows)
+
+
+def sync_scores_csv(csv_path, dates=None, db_path=None):
+    """
+    Keep the database's copy of a scores CSV in step with the file
+
+    Called by the parser and merges after they write the CSV.
+
+    Args:
+        csv_path: Path to the scores CSV that was written
+        dates: Dates whose rows changed (defaults to all, replacing the
+               CSV's holes)
+        db_path: Path to the database file (defaults to config.SQLITE_PATH)
+    """
+    conn = connect(db_path)
+    try:
+        if dates is None:
+            import_scores_csv(conn, csv_path)
+        else:
+            update_scores_csv(conn, csv_path, dates)
+    finally:
+        conn.close()
+
+
+def import_rounds_dir(conn, rounds_dir):
+    """
+    Import every round configuration found under a rounds directory
+
+    Returns:
+        int: Number of rounds imported
+    """
+    count = 0
+    for round_dir in sorted(os.listdir(rounds_dir)):
+        json_path = os.path.join(rounds_dir, round_dir, "config.json")
+        if os.path.isfile(json_path):
+            with open(json_path, 'r') as f:
+                save_round(conn, json.load(f))
+            count += 1
+    return count
+
+
+def import_all(db_path=None, rounds_dir="rounds", source_dir="sourceData"):
+    """One-shot import of the existing rounds/ directories and sourceData/*.csv files"""
+    conn = connect(db_path)
+    try:
+        print(f"Imported {import_rounds_dir(conn, rounds_dir)} rounds from {rounds_dir}/")
+        for name in sorted(os.listdir(source_dir)):
+            if name.endswith('.csv'):
+                holes = import_scores_csv(conn, os.path.join(source_dir, name))
+                print(f"Imported {holes} holes from {name}")
+    finally:
+        conn.close()
+
+
+def get_round_scores(conn, round_date_str, end_date_str=None, source=None, hole_count=None):
+    """
+    Get the scores for a round: the holes from the round date onwards
+
+    Args:
+        conn: Database connection
+        round_date_str: Round date in YYMMDD format
+        end_date_str: Last date of the round, if it has one (otherwise the
+                      round lasts hole_count holes)
+        source: File name of the scores CSV (defaults to config.SPREADSHEET_PATH)
+        hole_count: Number of holes (defaults to config.HOLES_PER_ROUND)
+
+    Returns:
+        list: (date, hole_num, player, score) rows ordered by date
+    """
+    source = source or os.path.basename(config.SPREADSHEET_PATH)
+    if end_date_str:
+        holes_query = """SELECT id, date, hole_num FROM holes
+                         WHERE source = ? AND date >= ? AND date <= ?"""
+        params = (source, round_date_str, end_date_str)
+    else:
+        holes_query = """SELECT id, date, hole_num FROM holes
+                         WHERE source = ? AND date >= ? ORDER BY date LIMIT ?"""
+        params = (source, round_date_str, hole_count or config.HOLES_PER_ROUND)
+    return conn.execute(
+        f"""SELECT h.date, h.hole_num, s.player, s.score
+            FROM ({holes_query}) h
+            JOIN scores s ON s.hole_id = h.id
+            ORDER BY h.date, s.player""",
+        params).fetchall()
+
+
+def get_player_scores(conn, player, start_date=None, end_date=None, source=None):
+    """
+    Get one player's scores, optionally within a date range (inclusive)
+
+    Returns:
+        list: (date, hole_num, score) rows ordered by date
+    """
+    source = source or os.path.basename(config.SPREADSHEET_PATH)
+    query = """SELECT h.date, h.hole_num, s.score
+               FROM scores s JOIN holes h ON h.id = s.hole_id
+               WHERE s.player = ? AND h.source = ?"""
+    params = [player, source]
+    if start_date:
+        query += " AND h.date >= ?"
+        params.append(start_date)
+    if end_date:
+        query += " AND h.date <= ?"
+        params.append(end_date)
+    return conn.execute(query + " ORDER BY h.date", params).fetchall()
+
+
+if __name__ == '__main__':
+    import sys
+    import_all(sys.argv[1] if len(sys.argv) > 1 else None)
+
+# Made with Bob
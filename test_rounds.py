@@ -1,70 +1,195 @@
 """
-Test script to analyze rounds in the data
+Test script to analyze rounds in the data and check the scores parser
 """
 
+import io
+import os
 import csv
-from datetime import datetime
-import config
+import tempfile
+from contextlib import redirect_stdout
+import score_store
+import parse_wordle_scores
 
-
-def parse_date(date_str):
-    """Convert date string like 'May-15' to a datetime object (assuming 2024)"""
-    try:
-        return datetime.strptime(f"{date_str}-2024", "%b-%d-%Y")
-    except ValueError:
-        return None
+# WhatsApp export the parser checks run against
+EXPORT_FILE = "sourceData/whatsappWordleDump.txt"
 
 
 def load_scores():
-    """Load scores from CSV file and organize by rounds"""
-    rounds = []
-    current_round = None
-    
-    with open(config.SPREADSHEET_PATH, 'r') as f:
-        reader = csv.reader(f)
-        rows = list(reader)
-        
-        # Skip first two rows (teams and player names)
-        player_names = [name.strip() for name in rows[1][2:]]
-        
-        for row in rows[2:]:
-            if not row or not row[0]:
-                continue
-                
-            date_str = row[0].strip()
-            hole_num = int(row[1].strip())
-            scores = [int(score.strip()) if score.strip() else config.DEFAULT_SCORE 
-                     for score in row[2:]]
-            
-            # If hole is 1, start a new round
-            if hole_num == 1:
-                if current_round:
-                    rounds.append(current_round)
-                current_round = {
-                    'holes': [],
-                    'start_date': None,
-                    'end_date': None
-                }
-            
-            # Add hole to current round
-            if current_round is not None:
-                hole_data = {
-                    'date': date_str,
-                    'date_obj': parse_date(date_str),
-                    'hole_num': hole_num,
-                    'scores': dict(zip(player_names, scores))
-                }
-                current_round['holes'].append(hole_data)
-                
-                if current_round['start_date'] is None:
-                    current_round['start_date'] = date_str
-                current_round['end_date'] = date_str
-        
-        # Don't forget the last round
-        if current_round and current_round['holes']:
-            rounds.append(current_round)
-    
-    return rounds, player_names
+    """Load scores from the score store and organize by rounds"""
+    store = score_store.load_store()
+    return score_store.get_rounds(store), store.players
+
+
+def parse_lines(input_file):
+    """Reference parse: every line of the export through parse_wordle_line"""
+    with open(input_file, 'r', encoding='utf-8', errors='replace') as f:
+        results = (parse_wordle_scores.parse_wordle_line(line.rstrip('\r\n')) for line in f)
+        return [result for result in results if result]
+
+
+def check_chunked_parser(input_file, chunk_sizes=(1024, 4096, 65536)):
+    """
+    Compare the chunked bulk parser with a line-by-line parse
+
+    Returns:
+        tuple: (number of checks that match, number of checks)
+    """
+    expected = parse_lines(input_file)
+    with open(input_file, 'rb') as f:
+        data = f.read()
+    checks = 0
+    matches = 0
+    for chunk_size in chunk_sizes:
+        chunks = parse_wordle_scores.find_chunk_boundaries(data, 0, len(data), chunk_size)
+        in_process = [result for start, end in chunks
+                      for result in parse_wordle_scores.parse_chunk(data, start, end)]
+        pooled = parse_wordle_scores.parse_export_bulk(input_file, workers=2,
+                                                       chunk_size=chunk_size)
+        for name, results in (('chunks', in_process), ('process pool', pooled)):
+            checks += 1
+            if results == expected:
+                matches += 1
+            else:
+                print(f"  MISMATCH: {name} with {len(chunks)} chunks of {chunk_size} bytes "
+                      f"gave {len(results)} scores, expected {len(expected)}")
+    return matches, checks
+
+
+def check_incremental_resume(input_file, cut_points=(0.5, 0.9, 0.95, 0.99, 0.995, 1.0)):
+    """
+    Parse the first part of the export, then the rest with --incremental,
+    and compare the CSV with a single full parse
+
+    The cut points are fractions of the export size, so most fall in the
+    middle of a line.
+
+    Returns:
+        tuple: (number of cut points whose CSV matches, number of cut
+                points, number that resumed from the checkpoint rather than
+                falling back to a full parse)
+    """
+    with open(input_file, 'rb') as f:
+        data = f.read()
+
+    matches = 0
+    resumed = 0
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        export = os.path.join(tmp_dir, "export.txt")
+        full_csv = os.path.join(tmp_dir, "full.csv")
+        with open(export, 'wb') as f:
+            f.write(data)
+        with redirect_stdout(io.StringIO()):
+            parse_wordle_scores.main(export, full_csv, workers=1)
+        with open(full_csv, 'rb') as f:
+            expected = f.read()
+
+        for cut_point in cut_points:
+            output = os.path.join(tmp_dir, f"cut-{cut_point}.csv")
+            with open(export, 'wb') as f:
+                f.write(data[:int(len(data) * cut_point)])
+            with redirect_stdout(io.StringIO()):
+                parse_wordle_scores.main(export, output, workers=1)
+            with open(export, 'wb') as f:
+                f.write(data)
+            log = io.StringIO()
+            with redirect_stdout(log):
+                parse_wordle_scores.main(export, output, incremental=True, workers=1)
+
+            with open(output, 'rb') as f:
+                result = f.read()
+            if result == expected:
+                matches += 1
+            else:
+                print(f"  MISMATCH: resuming from {cut_point:.1%} of the export")
+            if "Resuming from byte" in log.getvalue() and "full" not in log.getvalue():
+                resumed += 1
+    return matches, len(cut_points), resumed
+
+
+def check_merge_scores(input_file):
+    """
+    Merge held-back scores into a CSV written without them
+
+    Checks that late scores for existing dates and new dates at the end give
+    the same CSV as writing everything at once, that a new player becomes a
+    new column, that a date between existing ones is inserted in order, and
+    that merging the same scores twice changes nothing.
+
+    Returns:
+        tuple: (number of checks passed, number of checks)
+    """
+    def scores_by_date(scores):
+        by_date = {}
+        for date, player, score in scores:
+            by_date.setdefault(date, {})[player] = score
+        return by_date
+
+    # A player's repeated posts for a date are reduced to the last one, the
+    # score the CSV keeps
+    results = [(date, player, score)
+               for date, scores in scores_by_date(parse_lines(input_file)).items()
+               for player, score in scores.items()]
+    dates = sorted({date for date, _, _ in results})
+    players = sorted({player for _, player, _ in results})
+
+    def read(path):
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def read_rows(data):
+        return list(csv.reader(io.StringIO(data.decode('utf-8'))))
+
+    checks = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        full_csv = os.path.join(tmp_dir, "full.csv")
+        parse_wordle_scores.write_scores_csv(full_csv, scores_by_date(results), players)
+
+        # Hold back the last two dates and every third score of the rest,
+        # keeping the first score of each of those dates so its row exists
+        first_scores = {}
+        for i, (date, _, _) in enumerate(results):
+            first_scores.setdefault(date, i)
+        late = [r[0] in dates[-2:] or (i % 3 == 0 and first_scores[r[0]] != i)
+                for i, r in enumerate(results)]
+        held_back = [r for r, is_late in zip(results, late) if is_late]
+        kept = [r for r, is_late in zip(results, late) if not is_late]
+        merged_csv = os.path.join(tmp_dir, "merged.csv")
+        parse_wordle_scores.write_scores_csv(merged_csv, scores_by_date(kept), players)
+        summary = parse_wordle_scores.merge_scores(merged_csv, held_back)
+        checks.append(("late scores and new dates", read(merged_csv) == read(full_csv) and
+                       summary['new_dates'] == dates[-2:] and not summary['new_players']))
+
+        before = read(merged_csv)
+        parse_wordle_scores.merge_scores(merged_csv, held_back)
+        checks.append(("merging twice", read(merged_csv) == before))
+
+        parse_wordle_scores.merge_scores(merged_csv, [(dates[-1], "New Player", "3")])
+        old_rows = read_rows(before)
+        rows = read_rows(read(merged_csv))
+        checks.append(("new player",
+                       rows[1] == old_rows[1] + ["New Player"] and len(rows[0]) == len(rows[1]) and
+                       rows[2:] == [row + ["3"] if row[0] == dates[-1] else row
+                                    for row in old_rows[2:]]))
+
+        # A date missing from the middle goes in date order with the hole
+        # after the row before it; the other rows are left as they were
+        missing_date = dates[len(dates) // 2]
+        gap_csv = os.path.join(tmp_dir, "gap.csv")
+        parse_wordle_scores.write_scores_csv(
+            gap_csv, scores_by_date(r for r in results if r[0] != missing_date), players)
+        old_rows = read_rows(read(gap_csv))
+        parse_wordle_scores.merge_scores(gap_csv, [r for r in results if r[0] == missing_date])
+        rows = read_rows(read(gap_csv))
+        position = [row[0] for row in rows].index(missing_date)
+        checks.append(("date inserted in order",
+                       rows[:position] + rows[position + 1:] == old_rows and
+                       rows[position - 1][0] < missing_date < rows[position + 1][0] and
+                       int(rows[position][1]) == parse_wordle_scores.next_hole(int(rows[position - 1][1]))))
+
+    for name, passed in checks:
+        if not passed:
+            print(f"  FAILED: merge_scores {name}")
+    return sum(passed for _, passed in checks), len(checks)
 
 
 if __name__ == '__main__':
@@ -82,14 +207,29 @@ if __name__ == '__main__':
         print(f"Round {i}:")
         print(f"  Start Date: {round_data['start_date']}")
         print(f"  End Date:   {round_data['end_date']}")
-        print(f"  Holes:      {len(round_data['holes'])}")
+        print(f"  Holes:      {round_data['total_holes']}")
         
         # Show first and last hole numbers
-        first_hole = round_data['holes'][0]['hole_num']
-        last_hole = round_data['holes'][-1]['hole_num']
+        store = round_data['store']
+        first_hole = store.hole_num(round_data['start'])
+        last_hole = store.hole_num(round_data['stop'] - 1)
         print(f"  Hole Range: {first_hole} to {last_hole}")
         print()
     
     print("="*60)
+    print("PARSER CHECKS")
+    print("="*60 + "\n")
+    
+    matches, checks = check_chunked_parser(EXPORT_FILE)
+    print(f"Chunked parser check: {matches}/{checks} parses match the line-by-line parse")
+    
+    matches, checks, resumed = check_incremental_resume(EXPORT_FILE)
+    print(f"Incremental resume check: {matches}/{checks} cut points match the full parse "
+          f"({resumed} resumed from the checkpoint)")
+    
+    passed, checks = check_merge_scores(EXPORT_FILE)
+    print(f"Merge check: {passed}/{checks} merge_scores checks pass")
+    
+    print("\n" + "="*60)
 
 # Made with Bob
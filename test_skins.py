@@ -1,66 +1,18 @@
 """
-Test script to verify skins calculation
+Test script to verify skins calculation and player statistics
 """
 
-import csv
-from datetime import datetime
+import random
 import config
-
-
-def parse_date(date_str):
-    """Convert date string like 'May-15' to a datetime object (assuming 2024)"""
-    try:
-        return datetime.strptime(f"{date_str}-2024", "%b-%d-%Y")
-    except ValueError:
-        return None
+import score_store
+import skins_engine
+import player_stats
 
 
 def load_scores():
-    """Load scores from CSV file and organize by rounds"""
-    rounds = []
-    current_round = None
-    
-    with open(config.SPREADSHEET_PATH, 'r') as f:
-        reader = csv.reader(f)
-        rows = list(reader)
-        
-        player_names = [name.strip() for name in rows[1][2:]]
-        
-        for row in rows[2:]:
-            if not row or not row[0]:
-                continue
-                
-            date_str = row[0].strip()
-            hole_num = int(row[1].strip())
-            scores = [int(score.strip()) if score.strip() else config.DEFAULT_SCORE 
-                     for score in row[2:]]
-            
-            if hole_num == 1:
-                if current_round:
-                    rounds.append(current_round)
-                current_round = {
-                    'holes': [],
-                    'start_date': None,
-                    'end_date': None
-                }
-            
-            if current_round is not None:
-                hole_data = {
-                    'date': date_str,
-                    'date_obj': parse_date(date_str),
-                    'hole_num': hole_num,
-                    'scores': dict(zip(player_names, scores))
-                }
-                current_round['holes'].append(hole_data)
-                
-                if current_round['start_date'] is None:
-                    current_round['start_date'] = date_str
-                current_round['end_date'] = date_str
-        
-        if current_round and current_round['holes']:
-            rounds.append(current_round)
-    
-    return rounds, player_names
+    """Load scores from the score store and organize by rounds"""
+    store = score_store.load_store()
+    return score_store.get_rounds(store), store.players
 
 
 def calculate_skins(round_data, player_names):
@@ -72,8 +24,11 @@ def calculate_skins(round_data, player_names):
     print(f"  {'Hole':<6} {'Date':<10} {'Scores':<50} {'Winner':<15} {'Points'}")
     print(f"  {'-'*100}")
     
-    for hole in round_data['holes']:
-        scores = hole['scores']
+    store = round_data['store']
+    for row in range(round_data['start'], round_data['stop']):
+        scores = dict(zip(player_names, store.row(row)))
+        hole_num = store.hole_num(row)
+        date = store.date(row)
         points_pool += 1
         
         min_score = min(scores.values())
@@ -85,11 +40,11 @@ def calculate_skins(round_data, player_names):
         if len(winners) == 1:
             winner = winners[0]
             skins[winner] += points_pool
-            print(f"  {hole['hole_num']:<6} {hole['date']:<10} {scores_str:<50} {winner:<15} +{points_pool}")
+            print(f"  {hole_num:<6} {date:<10} {scores_str:<50} {winner:<15} +{points_pool}")
             points_pool = 0
         else:
             winners_str = ', '.join([w[:3] for w in winners])
-            print(f"  {hole['hole_num']:<6} {hole['date']:<10} {scores_str:<50} Tie ({winners_str})  Carry")
+            print(f"  {hole_num:<6} {date:<10} {scores_str:<50} Tie ({winners_str})  Carry")
     
     if points_pool > 0:
         print(f"\n  Note: {points_pool} point(s) carried over (round ended before being won)")
@@ -97,12 +52,99 @@ def calculate_skins(round_data, player_names):
     return skins
 
 
+def brute_force_summary(scores, start, stop):
+    """Player statistics over scores[start:stop] by scanning every hole"""
+    window = scores[start:stop]
+    played = [score for score in window if score != config.DEFAULT_SCORE]
+
+    def mean(values):
+        return sum(values) / len(values) if values else None
+
+    longest = run = 0
+    for score in window:
+        run = 0 if score == config.DEFAULT_SCORE else run + 1
+        longest = max(longest, run)
+    current = 0
+    for score in reversed(window):
+        if score == config.DEFAULT_SCORE:
+            break
+        current += 1
+
+    distribution = {str(value): window.count(value) for value in range(1, config.FAILED_SCORE)}
+    distribution['X'] = window.count(config.FAILED_SCORE)
+    return {
+        'holes': len(window),
+        'played': len(played),
+        'missed': len(window) - len(played),
+        'missed_rate': (len(window) - len(played)) / len(window) if window else None,
+        'failures': distribution['X'],
+        'failure_rate': distribution['X'] / len(played) if played else None,
+        'mean': mean(played),
+        'distribution': distribution,
+        'streaks': {'longest': longest, 'current': current},
+        'rolling': {str(size): mean([score for score in scores[max(0, stop - size):stop]
+                                     if score != config.DEFAULT_SCORE])
+                    for size in player_stats.ROLLING_WINDOWS}
+    }
+
+
+def check_player_stats(store, ranges=2000, seed=0):
+    """
+    Compare PlayerStats summaries with a brute-force scan over random
+    date ranges, including tables built up in several extends and tables
+    that had earlier scores corrected
+
+    Returns:
+        tuple: (number of summaries that match, number checked)
+    """
+    rng = random.Random(seed)
+    stats = player_stats.PlayerStats(store.players).extend(store)
+
+    # Tables extended a few holes at a time must match tables built at once
+    class Prefix:
+        """The first hole_count rows of a store, with one score changed on corrected_row"""
+        def __init__(self, hole_count, corrected_row=None):
+            self.players = store.players
+            self.player_count = store.player_count
+            self.hole_count = hole_count
+            scores = bytearray(store.scores[:hole_count * store.player_count])
+            if corrected_row is not None:
+                cell = corrected_row * store.player_count + rng.randrange(store.player_count)
+                scores[cell] = 3 if scores[cell] == config.DEFAULT_SCORE else config.DEFAULT_SCORE
+            self.scores = bytes(scores)
+
+    staged = player_stats.PlayerStats(store.players)
+    for hole_count in sorted(rng.sample(range(store.hole_count + 1), 5)) + [store.hole_count]:
+        staged = staged.extend(Prefix(hole_count))
+
+    # Late scores (on the last hole and earlier) are corrected in place, and
+    # the correction is then undone
+    for corrected_row in (store.hole_count - 1, rng.randrange(store.hole_count)):
+        staged = staged.extend(Prefix(store.hole_count, corrected_row)).extend(store)
+
+    columns = [bytes(store.scores[player::store.player_count])
+               for player in range(store.player_count)]
+    matches = 0
+    for _ in range(ranges):
+        player = rng.randrange(store.player_count)
+        start = rng.randrange(store.hole_count + 1)
+        stop = rng.randrange(start, store.hole_count + 1)
+        expected = brute_force_summary(list(columns[player]), start, stop)
+        if stats.summary(player, start, stop) == expected == staged.summary(player, start, stop):
+            matches += 1
+        else:
+            print(f"  MISMATCH: {store.players[player]} rows {start}-{stop}")
+    return matches, ranges
+
+
 if __name__ == '__main__':
     print("\n" + "="*100)
     print("SKINS COMPETITION - DETAILED CALCULATION")
     print("="*100)
     
     rounds, player_names = load_scores()
+    batch_results = skins_engine.calculate_all_skins(rounds[0]['store'], rounds) if rounds else []
+    mismatches = 0
     
     for i, round_data in enumerate(rounds, 1):
         print(f"\n{'='*100}")
@@ -119,7 +161,18 @@ if __name__ == '__main__':
         if max_skins > 0:
             winners = [p for p in player_names if skins_results[p] == max_skins]
             print(f"\n  Round Winner(s): {', '.join(winners)} with {max_skins} skins")
+        
+        # Cross-check against the batch skins engine
+        if batch_results[i - 1]['skins'] != skins_results:
+            mismatches += 1
+            print(f"\n  MISMATCH: batch engine gave {batch_results[i - 1]['skins']}")
+    
+    print("\n" + "="*100)
+    print(f"Batch engine check: {len(rounds) - mismatches}/{len(rounds)} rounds match")
     
-    print("\n" + "="*100 + "\n")
+    full_store = score_store.load_store("sourceData/Wordler Skins Parse Inputs - Scores Full.csv")
+    matches, checked = check_player_stats(full_store)
+    print(f"Player statistics check: {matches}/{checked} random ranges match a brute-force scan")
+    print("="*100 + "\n")
 
 # Made with Bob
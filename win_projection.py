@@ -0,0 +1,301 @@
+"""
+Win Projection Module
+Monte Carlo projection of an in-progress round: the remaining holes are
+sampled from each player's recent scores and the skins carry-over rules are
+played out over many simulated finishes at once
+"""
+
+import random
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import config
+import round_manager
+import round_results
+import player_stats
+import score_store
+
+# Pool for projections split into several batches (spawned rather than
+# forked, as the web process runs request threads)
+_pool = None
+_pool_lock = threading.Lock()
+
+# Projections by (round source hash, hash of the scores, simulations)
+_projections = {}
+
+
+def build_sample_table(histogram):
+    """
+    Build a table that maps a random byte to a score
+
+    Each score in player_stats.SCORE_VALUES gets a share of the 256 entries proportional to its count
+    in the histogram, so bytes.translate() turns a buffer of random bytes
+    into sampled scores.
+
+    Args:
+        histogram: Number of holes with each score (see player_stats.histogram)
+
+    Returns:
+        bytes: 256 scores
+    """
+    total = sum(histogram)
+    if not total:
+        return bytes([config.DEFAULT_SCORE]) * 256
+    table = bytearray()
+    cumulative = 0
+    for score, count in zip(player_stats.SCORE_VALUES, histogram):
+        cumulative += count
+        table.extend([score] * (round(256 * cumulative / total) - len(table)))
+    return bytes(table)
+
+
+def get_lane_width(max_value):
+    """Bytes per simulation needed to hold values up to max_value with a spare top bit"""
+    width = 1
+    while max_value >= 1 << (8 * width - 1):
+        width += 1
+    return width
+
+
+def to_lanes(flags, width):
+    """Pack a buffer of 0/1 bytes into an integer with one width-byte lane per simulation"""
+    if width > 1:
+        buffer = bytearray(len(flags) * width)
+        buffer[::width] = flags
+        flags = buffer
+    return int.from_bytes(flags, 'little')
+
+
+def simulate_batch(tables, skins, pot, holes, simulations, seed=None):
+    """
+    Play out the rest of a round many times over
+
+    Every simulation is a lane of a few bytes inside one large integer, so
+    each step of the skins rules (finding a hole's sole lowest score,
+    paying out or carrying the pot) is a handful of integer operations over
+    all simulations rather than a Python loop per simulation.
+
+    Args:
+        tables: Sample table (see build_sample_table) for each player
+        skins: Skins each player already has
+        pot: Points carried into the next hole
+        holes: Number of holes left to play
+        simulations: Number of simulated finishes
+        seed: Random seed, for repeatable results
+
+    Returns:
+        dict: 'wins' (simulations won by each player, shared on a tie) and
+              'skins' (total final skins of each player over all simulations)
+    """
+    rng = random.Random(seed)
+    players = len(tables)
+    width = get_lane_width(max(max(skins, default=0) + pot + holes, players))
+    bits = 8 * width
+    ones = int.from_bytes((b'\x01' + bytes(width - 1)) * simulations, 'little')
+    lane_mask = (1 << bits) - 1
+    all_lanes = ones * lane_mask
+    high = ones << (bits - 1)
+
+    # at_most[player][s - 1] maps a random byte to 1 if it samples a score <= s
+    at_most = [[bytes(int(score <= s) for score in table) for s in range(1, config.DEFAULT_SCORE)]
+               for table in tables]
+
+    totals = [ones * count for count in skins]
+    pool = ones * pot
+    for _ in range(holes):
+        below = []
+        for player in range(players):
+            draws = rng.randbytes(simulations)
+            below.append([to_lanes(draws.translate(table), width) for table in at_most[player]])
+
+        # A player wins the hole where they scored s and everyone else
+        # scored more than s
+        wins = [0] * players
+        for level in range(len(at_most[0]) if players else 0):
+            above = [ones ^ scores[level] for scores in below]
+            before = [ones]
+            for player in range(players - 1):
+                before.append(before[-1] & above[player])
+            after = ones
+            for player in reversed(range(players)):
+                exact = below[player][level]
+                if level:
+                    exact ^= below[player][level - 1]
+                if exact:
+                    wins[player] |= exact & before[player] & after
+                after &= above[player]
+
+        pool += ones
+        won = 0
+        for player, hole_won in enumerate(wins):
+            if hole_won:
+                hole_won *= lane_mask
+                totals[player] += pool & hole_won
+                won |= hole_won
+        pool &= all_lanes ^ won
+
+    def at_least(a, b):
+        """1 in each lane where a >= b (lane values stay below the top bit)"""
+        return (((a | high) - b) & high) >> (bits - 1)
+
+    leaders = []
+    for player in range(players):
+        leader = ones
+        for other in range(players):
+            if other != player:
+                leader &= at_least(totals[player], totals[other])
+        leaders.append(leader)
+    leader_count = sum(leaders)
+
+    win_counts = [0.0] * players
+    for count in range(1, players + 1):
+        count_lanes = ones * count
+        tied = at_least(leader_count, count_lanes) & at_least(count_lanes, leader_count)
+        if tied:
+            for player, leader in enumerate(leaders):
+                win_counts[player] += (leader & tied).bit_count() / count
+
+    skin_sums = [sum((total & (ones << bit)).bit_count() << bit for bit in range(bits - 1))
+                 for total in totals]
+    return {'wins': win_counts, 'skins': skin_sums}
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=config.PROJECTION_WORKERS,
+                                        mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def simulate(tables, skins, pot, holes, simulations, seed=None):
+    """
+    Run simulate_batch over config.PROJECTION_BATCH_SIZE simulations at a
+    time, in a process pool when there is more than one batch
+
+    Returns:
+        dict: Combined 'wins' and 'skins' (see simulate_batch)
+    """
+    global _pool
+    batch_size = config.PROJECTION_BATCH_SIZE
+    batches = [min(batch_size, simulations - start) for start in range(0, simulations, batch_size)]
+    seeds = [None if seed is None else seed + i for i in range(len(batches))]
+
+    if len(batches) > 1:
+        try:
+            pool = _get_pool()
+            futures = [pool.submit(simulate_batch, tables, skins, pot, holes, size, batch_seed)
+                       for size, batch_seed in zip(batches, seeds)]
+            results = [future.result() for future in futures]
+        except BrokenProcessPool:
+            _pool = None  # Start new processes for the next projection
+            raise
+    else:
+        results = [simulate_batch(tables, skins, pot, holes, size, batch_seed)
+                   for size, batch_seed in zip(batches, seeds)]
+
+    return {key: [sum(values) for values in zip(*(result[key] for result in results))]
+            for key in ('wins', 'skins')}
+
+
+def get_holes_remaining(round_config, results):
+    """
+    Number of holes left in a round: one per day up to its end date, else
+    the rest of config.HOLES_PER_ROUND
+    """
+    if not round_config.get('end_date'):
+        return max(0, config.HOLES_PER_ROUND - results['holes_played'])
+    end = round_manager.parse_round_date(round_config['end_date'])
+    last_played = None
+    if results['holes']:
+        last_played = score_store.parse_score_date(results['holes'][-1]['date'])
+    if last_played is None:
+        return max(0, (end - round_manager.parse_round_date(round_config['round_date'])).days + 1)
+    return max(0, (end - last_played).days)
+
+
+def get_projection_key(results, stats, simulations):
+    """Cache key of a projection: the round's source hash, the score history and the simulations"""
+    return (results['source_hash'], hash(stats.scores), simulations)
+
+
+def get_cached_projection(round_config, results, simulations=None):
+    """
+    Get a projection that has already been computed, without simulating
+
+    Args:
+        round_config: Round configuration from round_manager
+        results: The round's current results (round_results.get_round_results)
+        simulations: Number of simulated finishes (defaults to
+                     config.PROJECTION_SIMULATIONS)
+
+    Returns:
+        dict: The projection (see project_round), or None if it is not cached
+    """
+    _, stats = player_stats.get_player_stats()
+    return _projections.get(get_projection_key(results, stats,
+                                               simulations or config.PROJECTION_SIMULATIONS))
+
+
+def project_round(round_config, simulations=None, seed=None, results=None):
+    """
+    Project the outcome of a round's remaining holes
+
+    Each competitor's scores are sampled from their last
+    config.PROJECTION_HISTORY_HOLES holes (missed days included). Unseeded
+    projections are cached until the round's scores or the history change.
+
+    Args:
+        round_config: Round configuration from round_manager
+        simulations: Number of simulated finishes (defaults to
+                     config.PROJECTION_SIMULATIONS)
+        seed: Random seed, for repeatable results
+        results: The round's current results, if the caller already has them
+
+    Returns:
+        dict: 'simulations', 'holes_remaining' and 'players', each with
+              current 'skins', 'win_probability' (of finishing with the
+              most skins, shared on a tie) and 'expected_skins', most likely
+              winner first
+    """
+    simulations = simulations or config.PROJECTION_SIMULATIONS
+    store, stats = player_stats.get_player_stats()
+    if results is None:
+        results = round_results.get_round_results(round_config, store)
+
+    key = get_projection_key(results, stats, simulations)
+    if seed is None and key in _projections:
+        return _projections[key]
+
+    players = results['players']
+    columns = round_results.resolve_competitor_columns(round_config['competitors'], store)
+    start = max(0, store.hole_count - config.PROJECTION_HISTORY_HOLES)
+    tables = [build_sample_table(stats.histogram(column, start, store.hole_count)
+                                 if column is not None else [])
+              for column in columns]
+    skins = {standing['name']: standing['skins'] for standing in results['standings']}
+    current = [skins[name] for name in players]
+    holes = get_holes_remaining(round_config, results)
+
+    totals = simulate(tables, current, results['pot_carried'], holes, simulations, seed)
+    projection = {
+        'round_date': round_config['round_date'],
+        'simulations': simulations,
+        'holes_remaining': holes,
+        'players': sorted(({'name': name,
+                            'skins': count,
+                            'win_probability': wins / simulations,
+                            'expected_skins': skin_sum / simulations}
+                           for name, count, wins, skin_sum
+                           in zip(players, current, totals['wins'], totals['skins'])),
+                          key=lambda player: -player['win_probability'])
+    }
+    if seed is None:
+        if len(_projections) >= 64:
+            _projections.clear()
+        _projections[key] = projection
+    return projection
+
+# Made with Bob